@@ -0,0 +1,40 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Importing this module puts the game and decode.py on the import path, so
+that the scripts can be run from anywhere.
+"""
+
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'src', 'scratch'))
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'src', 'tcod'))
+
+import numpy as np  # noqa: E402
+from lib.tilemap import TileMap  # noqa: E402
+
+SEED = 1
+
+
+def best_of(function, *args, repeat=5):
+    """Return the seconds taken by the fastest of repeat function(*args)."""
+    return min(timeit.repeat(lambda: function(*args), number=1,
+                             repeat=repeat))
+
+
+def random_tiles(width, height, walls=0.3):
+    """
+    Return a tile map with the given fraction of walls, 60% of its cells
+    explored and 30% of those visible, the same for a given size.
+    """
+    rng = np.random.RandomState(SEED)
+    tiles = TileMap(width, height)
+    tiles.blocked_sight[:] = rng.random_sample((height, width)) < walls
+    tiles.blocked[:] = tiles.blocked_sight
+    tiles.explored[:] = rng.random_sample((height, width)) < 0.6
+    tiles.visible[:] = tiles.explored & (rng.random_sample((height, width))
+                                         < 0.3)
+    return tiles
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Compare the line by line regex-callback cleaner with decode.transcode(),
+its parallel mode and decode.transcode_mmap().
+
+Run from anywhere: python benchmarks/decode.py [--size MB] [--workers N]
+"""
+
+import argparse
+import io
+import os
+import random
+import re
+import tempfile
+import time
+
+from common import SEED
+
+import decode
+
+# Share of non-ASCII bytes and of lines with trailing whitespace in each
+# corpus.
+CORPORA = [('ascii', 0.0, 0.0), ('rare', 0.00001, 0.0),
+           ('sparse', 0.001, 0.01), ('dense', 0.05, 0.5)]
+
+
+def make_corpus(size, density, trailing):
+    rng = random.Random(SEED)
+    high = bytes(range(0x80, 0x100))
+    words = [bytes(rng.choice(b'abcdefghijklmnopqrstuvwxyz')
+                   for _ in range(rng.randint(1, 10))) for _ in range(1000)]
+    lines = []
+    length = 0
+    while length < size:
+        line = b' '.join(rng.choice(words) for _ in range(rng.randint(0, 15)))
+        line = bytes(rng.choice(high) if rng.random() < density else byte
+                     for byte in line)
+        if rng.random() < trailing:
+            line += rng.choice([b' ', b'\t', b'\r'])
+        line += b'\n'
+        lines.append(line)
+        length += len(line)
+    return b''.join(lines)
+
+
+def regex_callback(infile, outfile):
+    """The original cleaner: one re.sub() with a callback per line."""
+    def replace_chars(match):
+        return decode.chars[match.group(0)]
+
+    for line in infile:
+        line = line.rstrip()
+        line2 = line.decode('latin1').encode('utf8')
+        outfile.write(re.sub(b'(' + b'|'.join(decode.chars.keys()) + b')',
+                             replace_chars, line2) + b'\n')
+
+
+def timed(function, path, *args):
+    outfile = io.BytesIO()
+    start = time.perf_counter()
+    with open(path, 'rb') as infile:
+        function(infile, outfile, *args)
+    return time.perf_counter() - start, outfile.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=32,
+                        help="corpus size in MB")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print('%-8s %9s %9s %9s %9s %8s %8s %8s' % (
+        'corpus', 'regex s', 'table s', 'parallel', 'mmap s', 'table x',
+        'parallel', 'mmap x'))
+    for name, density, trailing in CORPORA:
+        with tempfile.NamedTemporaryFile() as corpus:
+            corpus.write(make_corpus(args.size << 20, density, trailing))
+            corpus.flush()
+
+            slow, expected = timed(regex_callback, corpus.name)
+            fast, output = timed(decode.transcode, corpus.name)
+            assert output == expected
+            parallel, output = timed(decode.transcode, corpus.name,
+                                     decode.CHUNK_SIZE, args.workers)
+            assert output == expected
+            mapped, output = timed(decode.transcode_mmap, corpus.name)
+            assert output == expected
+
+        print('%-8s %9.3f %9.3f %9.3f %9.3f %7.1fx %7.1fx %7.1fx' % (
+            name, slow, fast, parallel, mapped, slow / fast,
+            slow / parallel, slow / mapped))
+
+
+if __name__ == '__main__':
+    main()
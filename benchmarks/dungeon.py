@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Compare room placement tested against every earlier room with the
+occupancy plane of dungeon.carve_rooms(), and report generation time per
+map size.
+
+Run from anywhere: python benchmarks/dungeon.py
+"""
+
+import random
+
+from common import SEED, best_of
+
+from lib import dungeon
+from lib.tilemap import TileMap
+
+ROOM_MIN_SIZE = 6
+ROOM_MAX_SIZE = 10
+# Map sizes and the number of rooms tried on each, 30 on the game's map and
+# as many per cell on the larger ones.
+SIZES = [(80, 43, 30), (250, 250, 545), (1000, 1000, 8720)]
+
+
+def make_map_listed(width, height, max_rooms, rng):
+    """The original loop: each room is tested against all earlier rooms."""
+    tiles = TileMap(width, height)
+    rooms = []
+    for i in range(max_rooms):
+        w = rng.randint(ROOM_MIN_SIZE, ROOM_MAX_SIZE)
+        h = rng.randint(ROOM_MIN_SIZE, ROOM_MAX_SIZE)
+        x = rng.randint(1, width - w - 1)
+        y = rng.randint(1, height - h - 1)
+        new_room = dungeon.Rect(x, y, w, h)
+        if any(new_room.intersect(other) for other in rooms):
+            continue
+
+        dungeon.carve_room(tiles, new_room)
+        if rooms:
+            (new_x, new_y) = new_room.centre()
+            (prev_x, prev_y) = rooms[-1].centre()
+            if rng.randint(0, 1) == 0:
+                dungeon.carve_h_tunnel(tiles, prev_x, new_x, prev_y)
+                dungeon.carve_v_tunnel(tiles, prev_y, new_y, new_x)
+            else:
+                dungeon.carve_v_tunnel(tiles, prev_y, new_y, prev_x)
+                dungeon.carve_h_tunnel(tiles, prev_x, new_x, new_y)
+        rooms.append(new_room)
+    return tiles, len(rooms)
+
+
+def make_map_indexed(width, height, max_rooms, rng):
+    tiles = TileMap(width, height)
+    rooms = list(dungeon.carve_rooms(tiles, max_rooms, ROOM_MIN_SIZE,
+                                     ROOM_MAX_SIZE, rng))
+    return tiles, len(rooms)
+
+
+def seeded(function, *args):
+    """Call function(*args, rng) with a fresh rng for SEED."""
+    return function(*args, random.Random(SEED))
+
+
+def main():
+    print('%-10s %7s %7s %12s %12s %8s' % ('size', 'tries', 'rooms',
+                                           'listed ms', 'indexed ms',
+                                           'speedup'))
+    for width, height, max_rooms in SIZES:
+        slow = best_of(seeded, make_map_listed, width, height, max_rooms,
+                       repeat=1)
+        fast = best_of(seeded, make_map_indexed, width, height, max_rooms)
+        slow_tiles, count = seeded(make_map_listed, width, height, max_rooms)
+        fast_tiles, fast_count = seeded(make_map_indexed, width, height,
+                                        max_rooms)
+        assert count == fast_count
+        assert (slow_tiles.blocked == fast_tiles.blocked).all()
+        assert (slow_tiles.blocked_sight == fast_tiles.blocked_sight).all()
+
+        print('%-10s %7d %7d %12.3f %12.3f %7.1fx' % (
+            '%dx%d' % (width, height), max_rooms, count, slow * 1000,
+            fast * 1000, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Compare the per-cell tile drawing loop with the bulk draw_tiles() path.
+
+Run from anywhere: python benchmarks/render.py
+"""
+
+from common import best_of, random_tiles
+
+import tcod as libtcod
+from lib.render import draw_tiles
+
+COLOUR_VISIBLE = libtcod.Color(192, 192, 128)
+COLOUR_NOT_VISIBLE = libtcod.Color(64, 64, 64)
+SIZES = [(80, 43), (250, 250), (500, 500)]
+
+
+def draw_per_cell(con, tiles):
+    for row in range(tiles.height):
+        for col in range(tiles.width):
+            visible = tiles.visible[row, col]
+            if visible:
+                libtcod.console_set_char_foreground(
+                    con, col, row, COLOUR_VISIBLE)
+            elif tiles.explored[row, col]:
+                libtcod.console_set_char_foreground(
+                    con, col, row, COLOUR_NOT_VISIBLE)
+            else:
+                continue
+            if tiles.blocked_sight[row, col]:
+                libtcod.console_set_char(con, col, row, '#')
+            else:
+                libtcod.console_set_char(con, col, row, '.')
+
+
+def draw_bulk(con, tiles):
+    area = (slice(0, tiles.height), slice(0, tiles.width))
+    draw_tiles(con, tiles, area, COLOUR_VISIBLE, COLOUR_NOT_VISIBLE)
+
+
+def main():
+    print('%-10s %12s %12s %8s' % ('size', 'per-cell ms', 'bulk ms',
+                                    'speedup'))
+    for width, height in SIZES:
+        tiles = random_tiles(width, height)
+        slow_con = libtcod.console_new(width, height)
+        fast_con = libtcod.console_new(width, height)
+
+        slow = best_of(draw_per_cell, slow_con, tiles, repeat=3)
+        fast = best_of(draw_bulk, fast_con, tiles)
+        assert (slow_con.ch == fast_con.ch).all()
+        assert (slow_con.fg == fast_con.fg).all()
+
+        print('%-10s %12.3f %12.3f %7.1fx' % (
+            '%dx%d' % (width, height), slow * 1000, fast * 1000, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
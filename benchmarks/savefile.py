@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Compare pickling a tile map and entity records with lib.savefile, for
+growing maps with one entity per hundred cells.
+
+Run from anywhere: python benchmarks/savefile.py
+"""
+
+import os
+import pickle
+import tempfile
+
+from common import SEED, best_of
+
+import numpy as np
+from lib import savefile
+from lib.entities import EntityStore, record_dtype
+from lib.tilemap import TileMap
+
+SIZES = [(80, 43), (250, 250), (1000, 1000)]
+STATE = np.dtype([('time', '<i8'), ('kills', '<i4')])
+RECORD = record_dtype(('name', 'S32'), ('speed', '<i4'))
+
+
+def make_world(width, height):
+    rng = np.random.RandomState(SEED)
+    tiles = TileMap(width, height)
+    for name in savefile.PLANES:
+        getattr(tiles, name)[:] = rng.random_sample((height, width)) < 0.4
+
+    store = EntityStore()
+    count = width * height // 100
+    ids = [store.add(x=rng.randint(width), y=rng.randint(height),
+                     char=ord('T'), hp=3, max_hp=3) for _ in range(count)]
+    records = store.records(np.array(ids), RECORD)
+    records['name'] = b'troll'
+    records['speed'] = 100
+    state = np.zeros((), dtype=STATE)
+    return tiles, state, records
+
+
+def pickle_save(path, tiles, state, records):
+    with open(path, 'wb') as f:
+        pickle.dump((tiles, state, records), f, pickle.HIGHEST_PROTOCOL)
+
+
+def pickle_load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def main():
+    print('%-10s %8s %10s %10s %10s %10s %10s %10s' % (
+        'size', 'entities', 'pickle kB', 'packed kB', 'pickle ms',
+        'packed ms', 'unpickle', 'load ms'))
+    with tempfile.TemporaryDirectory() as directory:
+        pickled = os.path.join(directory, 'world.pickle')
+        packed = os.path.join(directory, 'world.sav')
+        for width, height in SIZES:
+            tiles, state, records = make_world(width, height)
+
+            dump = best_of(pickle_save, pickled, tiles, state, records)
+            save = best_of(savefile.save, packed, tiles, state, records)
+            unpickle = best_of(pickle_load, pickled)
+            load = best_of(savefile.load, packed, STATE, RECORD)
+
+            loaded, _, loaded_records = savefile.load(packed, STATE, RECORD)
+            for name in savefile.PLANES:
+                assert (getattr(loaded, name) == getattr(tiles, name)).all()
+            assert (loaded_records == records).all()
+
+            print('%-10s %8d %10.1f %10.1f %10.3f %10.3f %10.3f %10.3f' % (
+                '%dx%d' % (width, height), len(records),
+                os.path.getsize(pickled) / 1024,
+                os.path.getsize(packed) / 1024, dump * 1000, save * 1000,
+                unpickle * 1000, load * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+"""
+Time the hot paths of the game and of decode.py with fixed seeds, and
+compare the results with a stored baseline.
+
+Results are written as JSON. With a baseline, a case that got slower by
+more than the tolerance is reported as a regression and the exit status
+is 1.
+
+Run from anywhere: python benchmarks/suite.py [--filter fov] [--output
+results.json] [--baseline benchmarks/baseline.json] [--save-baseline]
+"""
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+# The game still uses the libtcodpy style API through tcod, which warns on
+# every call.
+warnings.simplefilter('ignore', FutureWarning)
+warnings.simplefilter('ignore', DeprecationWarning)
+
+from common import HERE, SEED, random_tiles  # noqa: E402
+
+import numpy as np  # noqa: E402
+import tcod as libtcod  # noqa: E402
+
+import basic3  # noqa: E402
+import decode  # noqa: E402
+import lib.fov as fov  # noqa: E402
+from lib import dungeon, level  # noqa: E402
+from lib.render import draw_tiles  # noqa: E402
+from lib.spatial import SpatialIndex  # noqa: E402
+from lib.tilemap import TileMap  # noqa: E402
+
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+# Cases by name, in the order they are run: (setup, unit, number). setup()
+# prepares a fresh state and returns a function to time and the amount of
+# unit it processes; that function is called number times per repeat.
+CASES = {}
+
+
+def case(name, unit='run', number=1):
+    def register(setup):
+        CASES[name] = (setup, unit, number)
+        return setup
+    return register
+
+
+# ############################################
+# Map generation
+# ############################################
+
+def new_world():
+    return basic3.World(quiet=True, seed=SEED)
+
+
+@case('mapgen.make_map', number=10)
+def make_map():
+    world = new_world()
+
+    def run():
+        world.objects = [world.player]
+        world.object_index = SpatialIndex()
+        world.object_index.add(world.player)
+        world.make_map()
+    return run, 1
+
+
+@case('mapgen.make_map2', number=10)
+def make_map2():
+    return new_world().make_map2, 1
+
+
+for _width, _height, _rooms in [(80, 43, 30), (1000, 1000, 8720)]:
+    def carve_rooms(width=_width, height=_height, max_rooms=_rooms):
+        def run():
+            tiles = TileMap(width, height)
+            list(dungeon.carve_rooms(tiles, max_rooms, basic3.ROOM_MIN_SIZE,
+                                     basic3.ROOM_MAX_SIZE,
+                                     random.Random(SEED)))
+        return run, 1
+
+    case('mapgen.carve_rooms.%dx%d' % (_width, _height),
+         number=10 if _width < 100 else 1)(carve_rooms)
+
+
+@case('mapgen.make_fov_map', number=1000)
+def make_fov_map():
+    return new_world().make_fov_map, 1
+
+
+@case('mapgen.generate_level', number=10)
+def generate_level():
+    def run():
+        level.generate(SEED, basic3.MAP_WIDTH, basic3.MAP_HEIGHT,
+                       basic3.MAX_ROOMS, basic3.ROOM_MIN_SIZE,
+                       basic3.ROOM_MAX_SIZE, basic3.MAX_ROOM_MONSTERS)
+    return run, 1
+
+
+# ############################################
+# Field of view
+# ############################################
+
+# Name prefixes of the FOV cases by backend, and by fraction of walls:
+# cluttered, and mostly open.
+FOV_ALGORITHMS = [('fov.', fov.RECURSIVE_SHADOWCASTING),
+                  ('fov.vectorized.', fov.VECTORIZED_SHADOWCASTING)]
+FOV_WALLS = [('', 0.3), ('open.', 0.02)]
+
+for _prefix, _algo in FOV_ALGORITHMS:
+    for _kind, _walls in FOV_WALLS:
+        for _width, _height in [(80, 43), (250, 250), (1000, 1000)]:
+            for _radius in [5, 20, 60]:
+                def compute_fov(width=_width, height=_height, radius=_radius,
+                                walls=_walls, algo=_algo):
+                    fov_map = fov.map_from_blocked_sight(
+                        random_tiles(width, height, walls).blocked_sight)
+
+                    def run():
+                        # Forget the last call, or it would be skipped as
+                        # unchanged.
+                        fov_map.key = None
+                        fov.map_compute_fov(fov_map, height // 2, width // 2,
+                                            radius, algo)
+                    return run, 1
+
+                case('%s%s%dx%d.r%d' % (_prefix, _kind, _width, _height,
+                                        _radius),
+                     number=200 if _radius < 20 else 20)(compute_fov)
+
+
+# ############################################
+# Rendering
+# ############################################
+
+for _width, _height in [(80, 43), (250, 250)]:
+    def tiles(width=_width, height=_height):
+        tiles = random_tiles(width, height)
+        console = libtcod.console_new(width, height)
+        area = (slice(0, height), slice(0, width))
+
+        def run():
+            draw_tiles(console, tiles, area, basic3.COLOUR_VISIBLE,
+                       basic3.COLOUR_NOT_VISIBLE)
+        return run, width * height
+
+    case('render.draw_tiles.%dx%d' % (_width, _height), unit='cell',
+         number=20)(tiles)
+
+
+@case('render.render_all', number=20)
+def render_all():
+    world = new_world()
+    root = libtcod.console_new(basic3.SCREEN_WIDTH, basic3.SCREEN_HEIGHT)
+    world.map.explored[:] = True
+    area = (slice(0, world.height), slice(0, world.width))
+
+    def run():
+        # A full redraw, as after the map has been revealed.
+        world.dirty.mark_area(area)
+        world.panel_hp = None
+        world.render_all(root)
+    return run, 1
+
+
+# ############################################
+# Monster turns
+# ############################################
+
+def arena(monsters):
+    """A world of one open room with monsters in view around the player."""
+    world = new_world()
+    world.map.blocked[:] = True
+    world.map.blocked[1:-1, 1:-1] = False
+    world.map.blocked_sight[:] = world.map.blocked
+    world.objects = []
+    world.object_index = SpatialIndex()
+    world.scheduler.restore(0, 0, [])
+
+    player = world.player
+    world.add_object(player)
+    world.object_index.move(player, world.width // 2, world.height // 2)
+    player.fighter.max_hp = player.fighter.hp = 10 ** 9
+    world.paths = basic3.path.DistanceMap(world.map.blocked,
+                                          basic3.PATH_RADIUS)
+    world.fov_map = world.make_fov_map()
+    world.fov_recompute = True
+    world.update_fov()
+
+    cells = np.argwhere(world.fov_map.fov & ~world.map.blocked)
+    cells = cells[(cells[:, 0] != player.y) | (cells[:, 1] != player.x)]
+    rng = np.random.RandomState(SEED)
+    for row, col in cells[rng.choice(len(cells), monsters, replace=False)]:
+        world.place_monster(int(col), int(row))
+    return world, [object for object in world.objects if object.ai]
+
+
+for _count in [10, 100, 1000]:
+    def take_turn(count=_count):
+        world, monsters = arena(count)
+
+        def run():
+            for monster in monsters:
+                monster.ai.take_turn()
+        return run, count
+
+    def monster_turns(count=_count):
+        world, monsters = arena(count)
+        return functools.partial(world.monster_turns, monsters), count
+
+    case('ai.take_turn.%d' % _count, unit='monster')(take_turn)
+    case('ai.monster_turns.%d' % _count, unit='monster')(monster_turns)
+
+
+# ############################################
+# decode.py
+# ############################################
+
+@functools.lru_cache()
+def corpus(size=8 << 20, density=0.001):
+    """Write a corpus of words with some latin1 bytes; return its path."""
+    rng = np.random.RandomState(SEED)
+    letters = np.frombuffer(b'abcdefghijklmnopqrstuvwxyz \n', dtype=np.uint8)
+    data = letters[rng.choice(len(letters), size,
+                              p=[0.03] * 26 + [0.16, 0.06])]
+    high = rng.random_sample(size) < density
+    data[high] = rng.randint(0x80, 0x100, int(high.sum()))
+    f = tempfile.NamedTemporaryFile(suffix='.txt', delete=False)
+    with f:
+        f.write(data.tobytes())
+    atexit.register(os.remove, f.name)
+    return f.name
+
+
+def devnull():
+    return open(os.devnull, 'wb')
+
+
+@case('decode.transcode', unit='MB')
+def transcode():
+    path = corpus()
+
+    def run():
+        with open(path, 'rb') as infile, devnull() as outfile:
+            decode.transcode(infile, outfile)
+    return run, os.path.getsize(path) / (1 << 20)
+
+
+@case('decode.transcode_mmap', unit='MB')
+def transcode_mmap():
+    path = corpus()
+
+    def run():
+        with open(path, 'rb') as infile, devnull() as outfile:
+            decode.transcode_mmap(infile, outfile)
+    return run, os.path.getsize(path) / (1 << 20)
+
+
+# ############################################
+# Running and comparing
+# ############################################
+
+def measure(setup, number, repeat):
+    """Return the amount processed per call and the seconds of each call."""
+    seconds = []
+    for _ in range(repeat):
+        run, amount = setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        seconds.append((time.perf_counter() - start) / number)
+    return amount, seconds
+
+
+def run_cases(names, repeat):
+    results = {}
+    for name in names:
+        setup, unit, number = CASES[name]
+        amount, seconds = measure(setup, number, repeat)
+        best = min(seconds)
+        results[name] = {
+            'best': best,
+            'median': statistics.median(seconds),
+            'unit': unit,
+            'per_second': amount / best,
+        }
+        print('%-30s %10.3f ms %12.1f %s/s' % (name, best * 1000,
+                                               amount / best, unit),
+              file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print each case against the baseline; return the regressed ones."""
+    regressed = []
+    print('%-30s %12s %12s %8s' % ('case', 'baseline ms', 'now ms', 'ratio'))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['best']
+        ratio = result['best'] / before
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressed.append(name)
+            flag = '  REGRESSED'
+        print('%-30s %12.3f %12.3f %7.2fx%s' % (
+            name, before * 1000, result['best'] * 1000, ratio, flag))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filter', default='',
+                        help="only run cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write the results to this file")
+    parser.add_argument('--baseline', default=BASELINE,
+                        help="results to compare with")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="slowdown over the baseline to report, as a "
+                             "fraction")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name]
+    results = run_cases(names, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': SEED,
+        'cases': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    regressed = []
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                stored = json.load(f)
+            stored['cases'].update(results)
+            results = stored['cases']
+        report['cases'] = results
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressed = compare(results, json.load(f)['cases'],
+                                args.tolerance)
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
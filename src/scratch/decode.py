@@ -1,48 +1,276 @@
-#!/usr/bin/python
+#!/usr/bin/env python3
+"""
+Convert a latin1 text file to UTF-8 and replace annoying characters.
 
-import sys
+Trailing whitespace is stripped from every line. The input is read in fixed
+size pieces that end on a line boundary where possible, and each piece is
+converted on its own and written out straight away, so memory use does not
+depend on the size of the file. With --workers the pieces are converted in
+parallel; output order is kept.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import mmap
+import os
 import re
-import codecs
+import stat
+import sys
 
-# remove annoying characters
+import numpy as np
+
+# remove annoying characters, keyed by their UTF-8 encoding
 chars = {
-    '\xc2\x82' : ',',        # High code comma
-    '\xc2\x84' : ',,',       # High code double comma
-    '\xc2\x85' : '...',      # Tripple dot
-    '\xc2\x88' : '^',        # High carat
-    '\xc2\x91' : '\x27',     # Forward single quote
-    '\xc2\x92' : '\x27',     # Reverse single quote
-    '\xc2\x93' : '\x22',     # Forward double quote
-    '\xc2\x94' : '\x22',     # Reverse double quote
-    '\xc2\x95' : '-',	     # What the heck is this?
-    '\xc2\x96' : '-',        # High hyphen
-    '\xc2\x97' : '--',       # Double hyphen
-    '\xc2\x99' : '-',
-    '\xc2\xa0' : ' ',
-    '\xc2\xa6' : '|',        # Split vertical bar
-    '\xc2\xab' : '<<',       # Double less than
-    '\xc2\xbb' : '>>',       # Double greater than
-    '\xc2\xbc' : '1/4',      # one quarter
-    '\xc2\xbd' : '1/2',      # one half
-    '\xc2\xbe' : '3/4',      # three quarters
-    '\xca\xbf' : '\x27',     # c-single quote
-    '\xcc\xa8' : '',         # modifier - under curve
-    '\xcc\xb1' : '',         # modifier - under line
-    '\xc3\x95' : '\'',	     # chaileon : tilde
-    '\xc3\x92' : '`',	     # chaileon : grave
-    '\xc3\x93' : '\'',       # chaileon : acute
-    '\xc3\x94' : '^',        # chaileon : circumflex
-    '\xc3\xbb' : '\xb0'
+    b'\xc2\x82' : b',',        # High code comma
+    b'\xc2\x84' : b',,',       # High code double comma
+    b'\xc2\x85' : b'...',      # Tripple dot
+    b'\xc2\x88' : b'^',        # High carat
+    b'\xc2\x91' : b'\x27',     # Forward single quote
+    b'\xc2\x92' : b'\x27',     # Reverse single quote
+    b'\xc2\x93' : b'\x22',     # Forward double quote
+    b'\xc2\x94' : b'\x22',     # Reverse double quote
+    b'\xc2\x95' : b'-',        # What the heck is this?
+    b'\xc2\x96' : b'-',        # High hyphen
+    b'\xc2\x97' : b'--',       # Double hyphen
+    b'\xc2\x99' : b'-',
+    b'\xc2\xa0' : b' ',
+    b'\xc2\xa6' : b'|',        # Split vertical bar
+    b'\xc2\xab' : b'<<',       # Double less than
+    b'\xc2\xbb' : b'>>',       # Double greater than
+    b'\xc2\xbc' : b'1/4',      # one quarter
+    b'\xc2\xbd' : b'1/2',      # one half
+    b'\xc2\xbe' : b'3/4',      # three quarters
+    b'\xca\xbf' : b'\x27',     # c-single quote
+    b'\xcc\xa8' : b'',         # modifier - under curve
+    b'\xcc\xb1' : b'',         # modifier - under line
+    b'\xc3\x95' : b'\'',       # chaileon : tilde
+    b'\xc3\x92' : b'`',        # chaileon : grave
+    b'\xc3\x93' : b'\'',       # chaileon : acute
+    b'\xc3\x94' : b'^',        # chaileon : circumflex
+    b'\xc3\xbb' : b'\xc2\xb0'  # degree sign
 }
 
+# Bytes read from the input at a time.
+CHUNK_SIZE = 1 << 20
+
+# Whitespace that str.rstrip() removes, apart from the newline itself.
+WHITESPACE = b' \t\r\x0b\x0c'
+
+TRAILING = re.compile(b'[' + re.escape(WHITESPACE) + b']+(?=\n)')
+
+# The bytes in WHITESPACE, for looking up a whole array of bytes at once.
+IS_WHITESPACE = np.zeros(256, dtype=np.bool_)
+IS_WHITESPACE[list(WHITESPACE)] = True
+
+# Unchanged bytes between two runs of changed lines that transcode_mmap()
+# writes as a slice rather than convert along with the runs. Below this,
+# a write per run costs more than converting the bytes.
+MIN_GAP = 256
+
+
+def _tables():
+    single_from = bytearray()
+    single_to = bytearray()
+    multi = []
+    for byte in range(0x80, 0x100):
+        utf8 = chr(byte).encode('utf8')
+        if utf8 not in chars:
+            continue
+        if len(chars[utf8]) == 1:
+            single_from.append(byte)
+            single_to += chars[utf8]
+        else:
+            multi.append((byte, utf8, chars[utf8]))
+    return bytes.maketrans(single_from, single_to), multi
+
+
+# Every latin1 byte is one character, so a replacement in chars stands for
+# a single input byte. Those that become a single byte are mapped with
+# bytes.translate() before transcoding; the few longer ones are replaced in
+# the UTF-8 output afterwards. Keys of chars that are not the encoding of a
+# latin1 character never matched and are not needed.
+SINGLE, MULTI = _tables()
+
+ASCII = bytes(range(0x80))
+
+
+def convert(piece):
+    """Convert a piece of input that ends on a line boundary."""
+    piece = TRAILING.sub(b'', piece)
+    if piece.isascii():
+        return piece
+    return replace(piece)
+
+
+def replace(piece):
+    """Transcode piece and replace the characters in chars."""
+    piece = piece.translate(SINGLE)
+    if piece.isascii():
+        return piece
+    # Only the bytes of piece that are left over are searched for in
+    # MULTI, rather than all of piece once per entry.
+    present = set(piece.translate(None, ASCII))
+    piece = piece.decode('latin1').encode('utf8')
+    for byte, char, replacement in MULTI:
+        if byte in present:
+            piece = piece.replace(char, replacement)
+    return piece
+
+
+def pieces(infile, chunk_size=CHUNK_SIZE):
+    """
+    Read infile in chunks and yield pieces that can be converted alone.
+
+    A piece ends after the last newline of what has been read. A chunk
+    without a newline is cut after its last non-whitespace byte, as only
+    whitespace at the end may still turn out to be trailing.
+    """
+    pending = b''
+    last = b'\n'
+    for chunk in iter(lambda: infile.read(chunk_size), b''):
+        data = pending + chunk
+        cut = data.rfind(b'\n') + 1 or len(data.rstrip(WHITESPACE))
+        if cut:
+            yield data[:cut]
+        pending = data[cut:]
+        last = chunk[-1:]
+
+    # Every line is written with a newline, including the last one.
+    if last != b'\n':
+        pending += b'\n'
+    if pending:
+        yield pending
+
+
+def transcode(infile, outfile, chunk_size=CHUNK_SIZE, workers=0):
+    """
+    Stream infile to outfile, both binary.
+
+    With workers set, pieces are converted by that many processes, with at
+    most two pieces per worker in flight.
+    """
+    if not workers:
+        for piece in pieces(infile, chunk_size):
+            outfile.write(convert(piece))
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        queue = collections.deque()
+        for piece in pieces(infile, chunk_size):
+            queue.append(pool.submit(convert, piece))
+            if len(queue) > 2 * workers:
+                outfile.write(queue.popleft().result())
+        while queue:
+            outfile.write(queue.popleft().result())
+
+
+def changed_lines(data, min_gap=MIN_GAP):
+    """
+    Return the starts and ends of the runs of lines in data that convert()
+    would change, joining runs less than min_gap bytes apart.
+
+    data is an array of the bytes of whole lines. A line changes if it has
+    a non-ASCII byte or ends in whitespace; both are found with one pass
+    of NumPy over the bytes each, rather than a regex or a find() per
+    pattern.
+    """
+    ends = np.flatnonzero(data == ord('\n')) + 1
+    starts = np.concatenate(([0], ends[:-1]))
+    # The last byte of each line before its newline, if it has one.
+    last = ends - 2
+    changed = (last >= starts) & IS_WHITESPACE[data[np.maximum(last, 0)]]
+    changed[np.searchsorted(ends, np.flatnonzero(data >= 0x80),
+                            side='right')] = True
+
+    edges = np.diff(changed, prepend=False, append=False)
+    first, stop = np.flatnonzero(edges).reshape(-1, 2).T
+    run_starts = starts[first]
+    run_ends = ends[stop - 1]
+    apart = np.flatnonzero(run_starts[1:] - run_ends[:-1] >= min_gap)
+    return (np.concatenate((run_starts[:1], run_starts[apart + 1])).tolist(),
+            np.concatenate((run_ends[apart], run_ends[-1:])).tolist())
+
+
+def strip_lines(data):
+    """
+    Return data, an array of the bytes of whole lines, as bytes without
+    trailing whitespace: what TRAILING.sub() does, without the regex.
+    """
+    kept = ~IS_WHITESPACE[data]
+    # The index of the first kept byte at or after each byte.
+    index = np.where(kept, np.arange(len(data)), len(data))
+    next_kept = np.minimum.accumulate(index[::-1])[::-1]
+    # Whitespace goes only if nothing but whitespace follows on its line.
+    kept |= data[next_kept] != ord('\n')
+    return data[kept].tobytes()
+
+
+def write_window(outfile, window):
+    """Write a buffer of whole lines converted, copying only what changes."""
+    data = np.frombuffer(window, dtype=np.uint8)
+    done = 0
+    for start, end in zip(*changed_lines(data)):
+        outfile.write(window[done:start])
+        piece = strip_lines(data[start:end])
+        outfile.write(piece if piece.isascii() else replace(piece))
+        done = end
+    outfile.write(window[done:])
+
+
+def transcode_mmap(infile, outfile, chunk_size=CHUNK_SIZE):
+    """
+    Stream infile to outfile through a memory map.
+
+    The map is scanned in place a window of lines at a time, and only the
+    runs of lines that change are copied out and converted; the spans
+    between them are written as slices of the map. Mostly ASCII input with
+    clean line ends thus costs little more than a plain copy. Input that
+    is not a regular file, such as a pipe, cannot be mapped and is
+    streamed with transcode() instead.
+    """
+    status = os.fstat(infile.fileno())
+    if not stat.S_ISREG(status.st_mode):
+        transcode(infile, outfile, chunk_size)
+        return
+
+    size = status.st_size
+    # A zero length file cannot be mapped, and has no lines to write.
+    if not size:
+        return
+
+    with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        with memoryview(data) as view:
+            start = 0
+            while start < size:
+                end = data.find(b'\n', min(start + chunk_size, size) - 1) + 1
+                if not end:
+                    # Every line is written with a newline, including the
+                    # last one.
+                    outfile.write(convert(data[start:] + b'\n'))
+                    break
+
+                write_window(outfile, view[start:end])
+                start = end
 
-def replace_chars(match):
-    char = match.group(0)
-    return chars[char]
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('infile', type=argparse.FileType('rb'))
+    parser.add_argument('outfile', type=argparse.FileType('wb'), nargs='?',
+                        default=sys.stdout.buffer)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--workers', type=int, default=0,
+                      help="number of processes to convert with")
+    mode.add_argument('--mmap', action='store_true',
+                      help="scan the input file in place through mmap")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="bytes to read at a time")
+    args = parser.parse_args()
 
-infile = open(sys.argv[1], 'r').readlines()
-for line in infile:
-    line = line.rstrip()
-    line2 = line.decode('latin1').encode('utf8')
-    print(re.sub('(' + '|'.join(chars.keys()) + ')', replace_chars, line2))
+    with args.infile, args.outfile:
+        if args.mmap:
+            transcode_mmap(args.infile, args.outfile, args.chunk_size)
+        else:
+            transcode(args.infile, args.outfile, args.chunk_size,
+                      args.workers)
@@ -1,10 +1,27 @@
 #!/usr/bin/env python
 
+import argparse
 import math
 import random
+import time
 
+import lib.chunks as chunks
 import lib.fov as fov
+import lib.path as path
+import lib.savefile as savefile
+import numpy as np
 import tcod as libtcod
+from lib.background import Background
+from lib.entities import EntityStore, column_property, record_dtype
+from lib.headless import random_keys, scripted_keys
+from lib.level import generate
+from lib.loop import Loop
+from lib.profiler import Profiler
+from lib.fov import region
+from lib.render import Camera, DirtyCells, draw_tiles
+from lib.schedule import Scheduler
+from lib.spatial import SpatialIndex
+from lib.tilemap import TileMap
 
 # ############################################
 # Constants
@@ -17,14 +34,21 @@ PANEL_HEIGHT = 7
 PANEL_Y = SCREEN_HEIGHT - PANEL_HEIGHT
 BAR_WIDTH = 20
 
-# Size of the map.
+# Size of the map, and of the part of a chunked world shown at once.
 MAP_WIDTH = 80
 MAP_HEIGHT = 43
 
+# Size of a chunked world in chunks, of its chunks in cells, and of the
+# window of chunks kept loaded around the player.
+WORLD_CHUNKS = 64
+CHUNK_SIZE = 32
+ACTIVE_CHUNKS = 3
+
 # Parameters for dungeon generator.
 ROOM_MAX_SIZE = 10
 ROOM_MIN_SIZE = 6
 MAX_ROOMS = 30
+CHUNK_ROOMS = 6
 MAX_ROOM_MONSTERS = 3
 
 # Player parameters.
@@ -33,10 +57,17 @@ PLAYER_HP = 10
 PLAYER_POWER = 5
 PLAYER_DEFENSE = 5
 
+# Time a player action takes, and the speed at which a monster acts once
+# for every player action.
+TURN_TIME = 100
+NORMAL_SPEED = 100
+
 # Monster parameters.
+PATH_RADIUS = 2 * LIGHT_RADIUS
 TROLL_HP = 3
 TROLL_POWER = 6
 TROLL_DEFENSE = 1
+TROLL_SPEED = NORMAL_SPEED
 
 # Visual paramters.
 COLOUR_VISIBLE = libtcod.Color(192, 192, 128)
@@ -51,7 +82,8 @@ PLAYER_DEATH_COLOUR = libtcod.Color(192, 0, 0)
 # ############################################
 
 
-def render_bar(x, y, total_width, name, value, maximum, bar_color, back_color):
+def render_bar(panel, x, y, total_width, name, value, maximum, bar_color,
+               back_color):
     # render a bar (HP, experience, etc). first calculate the width of the bar
     bar_width = int(float(value) / maximum * total_width)
 
@@ -102,115 +134,153 @@ dungeon = ["...........................................................",
            "###########################################################"]
 
 
-def make_map2():
-    global map
-    map = [[Tile(False) for col in range(MAP_WIDTH)]
-           for row in range(MAP_HEIGHT)]
-
-    for row, row_actual in enumerate(dungeon):
-        for col, col_actual in enumerate(row_actual):
-            if dungeon[row][col] == '#':
-                map[row][col] = Tile(True)
-
-
 # ############################################
 # Classes
 # ############################################
 
 
 class Object:
-    """Represents a generic object on the screen."""
+    """
+    Represents a generic object on the screen.
+
+    Position, glyph, colour and combat stats are kept in the columns of an
+    entity store and read and written through attributes here. Objects are
+    moved to the store of the world they are added to; pass that store to
+    create them there directly. Without one, an object gets a store of its
+    own, so worlds never share one.
+    """
+
+    __slots__ = ('entity', 'name', 'fighter', 'ai', 'world')
+
+    x = column_property('x')
+    y = column_property('y')
+    blocks = column_property('blocks')
 
     def __init__(self, x, y, char, name, colour, blocks=False,
-                 fighter=None, ai=None):
-        self.x = x
-        self.y = y
-        self.char = char
+                 fighter=None, ai=None, store=None):
+        if store is None:
+            store = EntityStore(capacity=1)
+        stats = fighter.stats if fighter else {}
+        self.entity = (store, store.add(x=x, y=y, char=ord(char),
+                                        colour=tuple(colour), blocks=blocks,
+                                        **stats))
         self.name = name
-        self.colour = colour
-        self.blocks = blocks
         self.fighter = fighter
         self.ai = ai
+        self.world = None
         if self.fighter:
             self.fighter.owner = self
+            self.fighter.stats = None
         if self.ai:
             self.ai.owner = self
 
+    @classmethod
+    def from_entity(cls, store, id, name, fighter=None, ai=None):
+        """Wrap an entity already in store, e.g. one read from a snapshot."""
+        self = cls.__new__(cls)
+        self.entity = (store, id)
+        self.name = name
+        self.fighter = fighter
+        self.ai = ai
+        self.world = None
+        if self.fighter:
+            self.fighter.owner = self
+            self.fighter.stats = None
+        if self.ai:
+            self.ai.owner = self
+        return self
+
+    @property
+    def char(self):
+        store, id = self.entity
+        return chr(store.char[id])
+
+    @char.setter
+    def char(self, char):
+        store, id = self.entity
+        store.char[id] = ord(char)
+
+    @property
+    def colour(self):
+        store, id = self.entity
+        return libtcod.Color(*store.colour[id].tolist())
+
+    @colour.setter
+    def colour(self, colour):
+        store, id = self.entity
+        store.colour[id] = tuple(colour)
+
+    def move_to_store(self, store):
+        """Move the entity of this object into store, if not already there."""
+        old, id = self.entity
+        if old is not store:
+            self.entity = (store, store.add(**old.row(id)))
+            old.remove(id)
+
     def move(self, dx, dy):
-        if not is_blocked(self.y + dy, self.x + dx):
-            self.x += dx
-            self.y += dy
+        world = self.world
+        if not world.is_blocked(self.y + dy, self.x + dx):
+            world.dirty.mark(self.x, self.y)
+            world.object_index.move(self, self.x + dx, self.y + dy)
+            world.dirty.mark(self.x, self.y)
 
     def draw(self):
-        if fov.map_is_in_fov(fov_map, self.y, self.x):
-            libtcod.console_set_char_foreground(
-                con, self.x, self.y, self.colour)
-            libtcod.console_set_char(con, self.x, self.y, self.char)
+        world = self.world
+        store, id = self.entity
+        y, x = store.y[id], store.x[id]
+        if fov.map_is_in_fov(world.fov_map, y, x):
+            world.con.ch[y, x] = store.char[id]
+            world.con.fg[y, x] = store.colour[id]
 
     def distance_to(self, other):
         dx = other.x - self.x
         dy = other.y - self.y
         return math.sqrt(dx ** 2 + dy ** 2)
 
-    def move_towards(self, target_y, target_x):
-        dy = target_y - self.y
-        dx = target_x - self.x
-        distance = math.sqrt(dx ** 2 + dy ** 2)
+    def path_towards(self, target):
+        """Take one step along a shortest path to target, around walls."""
+        world = self.world
+        paths = world.paths
+        paths.update(target.y, target.x)
+        if not paths.covers(self.y, self.x):
+            # Outside the shared distance map: search for this object alone.
+            route = path.astar(world.map.blocked, (self.y, self.x),
+                               (target.y, target.x))
+            step = route[0] if route else None
+            if step is not None and world.is_blocked(*step):
+                step = None
+        else:
+            step = paths.step(self.y, self.x, world.is_blocked)
 
-        dx = int(round(dx / distance))
-        dy = int(round(dy / distance))
-        self.move(dx, dy)
+        if step is not None:
+            self.move(step[1] - self.x, step[0] - self.y)
 
     def send_to_back(self):
-        global objects
+        objects = self.world.objects
         objects.remove(self)
         objects.insert(0, self)
 
-    def clear(self):
-        libtcod.console_set_char(con, self.x, self.y, ' ')
-
-
-class Tile:
-    """Represents a tile on the map and it's properties."""
-
-    def __init__(self, blocked, blocked_sight=None):
-        self.blocked = blocked
-        self.explored = False
-
-        if blocked_sight is None:
-            blocked_sight = blocked
-        self.blocked_sight = blocked_sight
-
-
-class Rect:
-    """Represents a rectangle on the map. Used to characterise a room."""
-
-    def __init__(self, x, y, w, h):
-        self.x1 = x
-        self.y1 = y
-        self.x2 = x + w
-        self.y2 = y + h
-
-    def centre(self):
-        centre_x = (self.x1 + self.x2) // 2
-        centre_y = (self.y1 + self.y2) // 2
-        return (centre_x, centre_y)
-
-    def intersect(self, other):
-        return (self.x1 <= other.x2 and self.x2 >= other.x1 and
-                self.y1 <= other.y2 and self.y2 >= other.y1)
-
 
 class Fighter:
     """Combat-related properties and methods. Used for composition with an Object."""
 
+    __slots__ = ('owner', 'death_function', 'stats')
+
+    hp = column_property('hp')
+    max_hp = column_property('max_hp')
+    defense = column_property('defense')
+    power = column_property('power')
+
     def __init__(self, hp, defense, power, death_function=None):
-        self.max_hp = hp
-        self.hp = hp
-        self.defense = defense
-        self.power = power
+        self.owner = None
+        # Held until the owning Object puts them in its entity.
+        self.stats = dict(hp=hp, max_hp=hp, defense=defense, power=power)
         self.death_function = death_function
 
+    @property
+    def entity(self):
+        return self.owner.entity
+
     def take_damage(self, damage):
         if damage > 0:
             self.hp -= damage
@@ -220,10 +290,11 @@ class Fighter:
                 function(self.owner)
 
     def attack(self, target):
+        self.owner.world.profiler.counts['attacks'] += 1
         damage = self.power - target.fighter.defense
 
         if damage > 0:
-            print(
+            self.owner.world.message(
                 self.owner.name.capitalize() +
                 " attacks " +
                 target.name +
@@ -232,7 +303,7 @@ class Fighter:
                 " hit points.")
             target.fighter.take_damage(damage)
         else:
-            print(
+            self.owner.world.message(
                 self.owner.name.capitalize() +
                 " attacks " +
                 target.name +
@@ -242,175 +313,724 @@ class Fighter:
 class BasicMonster:
     """AI for a basic melee creep."""
 
+    __slots__ = ('owner', 'speed')
+
+    def __init__(self, speed=NORMAL_SPEED):
+        self.owner = None
+        self.speed = speed
+
+    def delay(self):
+        """Time from one action to the next."""
+        return TURN_TIME * NORMAL_SPEED // self.speed
+
     def take_turn(self):
         monster = self.owner
-        if fov.map_is_in_fov(fov_map, monster.y, monster.x):
+        world = monster.world
+        player = world.player
+        if fov.map_is_in_fov(world.fov_map, monster.y, monster.x):
             if monster.distance_to(player) >= 2:
-                monster.move_towards(player.y, player.x)
+                monster.path_towards(player)
             elif player.fighter.hp >= 0:
                 monster.fighter.attack(player)
 
 
-# ############################################
-# Utility Functions
-# ############################################
-
-
-def is_blocked(y, x):
-    if map[y][x].blocked:
-        return True
-
-    for object in objects:
-        if object.blocks and object.x == x and object.y == y:
-            return True
-
-    return False
-
-
-# ############################################
-# Map Generation Functions
-# ############################################
-
-
-def create_room(room):
-    global map
-    for row in range(room.y1, room.y2):
-        for col in range(room.x1, room.x2):
-            map[row][col].blocked = False
-            map[row][col].blocked_sight = False
-
-
-def create_h_tunnel(x1, x2, row):
-    global map
-    for col in range(min(x1, x2), max(x1, x2) + 1):
-        map[row][col].blocked = False
-        map[row][col].blocked_sight = False
-
-
-def create_v_tunnel(y1, y2, col):
-    global map
-    for row in range(min(y1, y2), max(y1, y2) + 1):
-        map[row][col].blocked = False
-        map[row][col].blocked_sight = False
-
-
-def make_map():
-    global map, player
-    map = [[Tile(True) for col in range(MAP_WIDTH)]
-           for row in range(MAP_HEIGHT)]
-
-    rooms = []
-    num_rooms = 0
-
-    for i in range(MAX_ROOMS):
-        w = random.randint(ROOM_MIN_SIZE, ROOM_MAX_SIZE)
-        h = random.randint(ROOM_MIN_SIZE, ROOM_MAX_SIZE)
-        x = random.randint(1, MAP_WIDTH - w - 1)
-        y = random.randint(1, MAP_HEIGHT - h - 1)
-        new_room = Rect(x, y, w, h)
-
-        failed = False
-        for other_room in rooms:
-            if new_room.intersect(other_room):
-                failed = True
-                break
-
-        if not failed:
-            create_room(new_room)
-            (new_x, new_y) = new_room.centre()
-            if num_rooms == 0:
-                player.x = new_x
-                player.y = new_y
-            else:
-                place_objects(new_room)
-                (prev_x, prev_y) = rooms[num_rooms - 1].centre()
-                if random.randint(0, 1) == 0:
-                    create_h_tunnel(prev_x, new_x, prev_y)
-                    create_v_tunnel(prev_y, new_y, new_x)
-                else:
-                    create_v_tunnel(prev_y, new_y, prev_x)
-                    create_h_tunnel(prev_x, new_x, new_y)
-            rooms.append(new_room)
-            num_rooms += 1
-
-
-def place_objects(room):
-    num_monsters = random.randint(0, MAX_ROOM_MONSTERS)
-    for i in range(num_monsters):
-        x = random.randint(room.x1, room.x2)
-        y = random.randint(room.y1, room.y2)
-        if not is_blocked(y, x):
+class World:
+    """
+    Owns everything about one game: map, objects, FOV and consoles.
+
+    Nothing here is shared between worlds, so any number of them can be
+    played side by side in one process. The level is generated from seed,
+    or taken from levels, a LevelCache, if given. With snapshot, the path
+    of a file written by save(), the world carries on from there instead.
+    Time spent and events are recorded by profiler, a Profiler, and shown
+    on the panel while show_profile is set.
+    """
+
+    def __init__(self, quiet=False, seed=None, levels=None, snapshot=None,
+                 profiler=None):
+        self.quiet = quiet
+        self.seed = seed
+        self.levels = levels
+        self.width, self.height = self.map_size()
+
+        self.con = libtcod.console_new(self.width, self.height)
+        self.panel = libtcod.console_new(SCREEN_WIDTH, PANEL_HEIGHT)
+        libtcod.console_set_default_background(self.con,
+                                               libtcod.Color(0, 0, 0))
+        libtcod.console_set_default_foreground(self.con,
+                                               libtcod.Color(127, 127, 127))
+        libtcod.console_clear(self.con)
+
+        self.map = None
+        self.entities = EntityStore()
+        self.objects = []
+        self.object_index = SpatialIndex()
+        # Monsters in view, by the time of their next action. The others
+        # are dormant until they come into view.
+        self.scheduler = Scheduler()
+        self.dirty = DirtyCells(self.width, self.height)
+        self.camera = Camera(MAP_WIDTH, MAP_HEIGHT, self.width, self.height)
+        self.game_state = 'playing'
+        self.kills = 0
+        # Before the map, as is_blocked() and attacks count into it.
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.show_profile = False
+
+        if snapshot is not None:
+            self.load(snapshot)
+        else:
             fighter_component = Fighter(
-                hp=TROLL_HP,
-                defense=TROLL_DEFENSE,
-                power=TROLL_POWER,
-                death_function=monster_death)
-            ai_component = BasicMonster()
-            monster = Object(x, y, 'T', 'troll', TROLL_COLOUR, blocks=True,
-                             fighter=fighter_component, ai=ai_component)
-            objects.append(monster)
-
+                hp=PLAYER_HP,
+                defense=PLAYER_DEFENSE,
+                power=PLAYER_POWER,
+                death_function=player_death)
+            self.player = Object(0, 0, '@', 'player',
+                                 libtcod.Color(127, 127, 127), blocks=True,
+                                 fighter=fighter_component,
+                                 store=self.entities)
+            self.add_object(self.player)
+            self.make_map()
+
+        # Shared by all monsters, and rebuilt only when the player moves.
+        self.paths = path.DistanceMap(self.map.blocked, PATH_RADIUS)
+
+        self.fov_map = self.make_fov_map()
+
+        self.fov_recompute = True
+        self.panel_hp = None
+
+    def map_size(self):
+        """Width and height of the map the world is played on."""
+        return MAP_WIDTH, MAP_HEIGHT
+
+    def close(self):
+        """Let go of anything the world runs outside itself."""
+
+    def add_object(self, object):
+        object.move_to_store(self.entities)
+        object.world = self
+        self.objects.append(object)
+        self.object_index.add(object)
+
+    def message(self, text):
+        if not self.quiet:
+            print(text)
+
+    # ############################################
+    # Utility Functions
+    # ############################################
+
+    def is_blocked(self, y, x):
+        self.profiler.counts['is_blocked'] += 1
+        if self.map.blocked[y, x]:
+            return True
 
-# ############################################
-# Drawing Functions
-# ############################################
+        return self.object_index.blocker_at(x, y) is not None
 
+    # ############################################
+    # Map Generation Functions
+    # ############################################
 
-def render_all():
-    global fov_map, fov_recompute
-
-    if fov_recompute:
-        fov_recompute = False
-        fov.map_compute_fov(fov_map, player.y, player.x,
-                            LIGHT_RADIUS, fov.RECURSIVE_SHADOWCASTING)
-        for row in range(MAP_HEIGHT):
-            for col in range(MAP_WIDTH):
-                visible = fov.map_is_in_fov(fov_map, row, col)
-                wall = map[row][col].blocked_sight
-                draw = False
-
-                if not visible:
-                    if map[row][col].explored:
-                        draw = True
-                        libtcod.console_set_char_foreground(
-                            con, col, row, COLOUR_NOT_VISIBLE)
-                else:
-                    draw = True
-                    libtcod.console_set_char_foreground(
-                        con, col, row, COLOUR_VISIBLE)
-                    map[row][col].explored = True
-
-                if draw:
-                    if wall:
-                        libtcod.console_set_char(con, col, row, '#')
-                    else:
-                        libtcod.console_set_char(con, col, row, '.')
-
-    for object in objects:
-        if object != player:
+    def make_map(self):
+        params = (MAP_WIDTH, MAP_HEIGHT, MAX_ROOMS, ROOM_MIN_SIZE,
+                  ROOM_MAX_SIZE, MAX_ROOM_MONSTERS)
+        if self.levels is not None and self.seed is not None:
+            level = self.levels.get(self.seed, *params)
+        else:
+            level = generate(self.seed, *params)
+
+        # Levels may be shared with other worlds, so the planes are copied.
+        self.map = TileMap(self.width, self.height)
+        self.map.blocked[:] = level.blocked
+        self.map.blocked_sight[:] = level.blocked_sight
+        self.object_index.move(self.player, *level.start)
+        for x, y in level.monsters.tolist():
+            self.place_monster(x, y)
+
+    def make_map2(self):
+        self.map = TileMap(self.width, self.height, blocked=False)
+
+        walls = np.array([[c == '#' for c in line] for line in dungeon])
+        height, width = walls.shape
+        self.map.blocked[:height, :width] = walls
+        self.map.blocked_sight[:height, :width] = walls
+
+    def place_monster(self, x, y):
+        fighter_component = Fighter(
+            hp=TROLL_HP,
+            defense=TROLL_DEFENSE,
+            power=TROLL_POWER,
+            death_function=monster_death)
+        ai_component = BasicMonster(TROLL_SPEED)
+        monster = Object(x, y, 'T', 'troll', TROLL_COLOUR,
+                         blocks=True, fighter=fighter_component,
+                         ai=ai_component, store=self.entities)
+        self.add_object(monster)
+
+    def make_fov_map(self):
+        return fov.map_from_blocked_sight(self.map.blocked_sight)
+
+    def set_tile(self, x, y, blocked, blocked_sight):
+        """Change one tile, e.g. as a door opens, and what depends on it."""
+        self.map.blocked[y, x] = blocked
+        self.map.blocked_sight[y, x] = blocked_sight
+        fov.map_set_properties(self.fov_map, y, x, blocked_sight)
+        # The distance map reads the blocked plane but only when rebuilt.
+        self.paths.goal = None
+        self.fov_recompute = True
+        self.dirty.mark(x, y)
+
+    # ############################################
+    # Snapshots
+    # ############################################
+
+    def object_records(self, objects):
+        """Return a RECORD for each of objects."""
+        ids = np.array([object.entity[1] for object in objects], dtype=np.intp)
+        records = self.entities.records(ids, RECORD)
+        records['name'] = [object.name.encode() for object in objects]
+        records['fighter'] = [object.fighter is not None
+                              for object in objects]
+        records['death'] = [
+            DEATH_FUNCTIONS.index(object.fighter.death_function)
+            if object.fighter else 0 for object in objects]
+        records['speed'] = [object.ai.speed if object.ai else 0
+                            for object in objects]
+        due = {id(actor): (time, order)
+               for time, order, actor in self.scheduler.queue}
+        records['due'], records['order'] = np.array(
+            [due.get(id(object), (0, -1)) for object in objects],
+            dtype=np.int64).reshape(-1, 2).T
+        return records
+
+    def add_records(self, records):
+        """
+        Add an object for each RECORD in records.
+
+        Returns (time, order, object) entries for the objects that were
+        scheduled to act, for the scheduler to be restored from.
+        """
+        # Columns are turned into lists once rather than read per record.
+        ids = self.entities.extend(records).tolist()
+        names = records['name'].tolist()
+        fighters = records['fighter'].tolist()
+        deaths = records['death'].tolist()
+        speeds = records['speed'].tolist()
+        dues = records['due'].tolist()
+        orders = records['order'].tolist()
+        entries = []
+        for i, id in enumerate(ids):
+            fighter = ai = None
+            if fighters[i]:
+                fighter = Fighter(0, 0, 0, DEATH_FUNCTIONS[deaths[i]])
+            if speeds[i]:
+                ai = BasicMonster(speeds[i])
+            object = Object.from_entity(self.entities, id, names[i].decode(),
+                                        fighter, ai)
+            object.world = self
+            self.objects.append(object)
+            self.object_index.add(object)
+            if orders[i] >= 0:
+                entries.append((dues[i], orders[i], object))
+        return entries
+
+    def save(self, path):
+        """Write the map, the objects and the monster schedule to path."""
+        state = np.zeros((), dtype=STATE)
+        state['time'] = self.scheduler.time
+        state['order'] = self.scheduler.order
+        state['kills'] = self.kills
+        state['player'] = self.objects.index(self.player)
+        state['game_state'] = self.game_state.encode()
+        savefile.save(path, self.map, state,
+                      self.object_records(self.objects))
+
+    def load(self, path):
+        tiles, state, records = savefile.load(path, STATE, RECORD)
+        if tiles.shape != (self.height, self.width):
+            raise ValueError("snapshot map is not %dx%d: %s" % (
+                self.width, self.height, path))
+        self.map = tiles
+
+        entries = self.add_records(records)
+        self.player = self.objects[int(state['player'])]
+        self.scheduler.restore(int(state['time']), int(state['order']),
+                               entries)
+        self.kills = int(state['kills'])
+        self.game_state = state['game_state'].decode()
+        # Nothing has been drawn yet.
+        self.dirty.mark_mask((slice(0, self.height), slice(0, self.width)),
+                             self.map.explored)
+
+    # ############################################
+    # Drawing Functions
+    # ############################################
+
+    def draw_order(self, object):
+        # Remains first, then anything blocking, with the player on top.
+        return (object is self.player, object.blocks)
+
+    def draw_objects(self, row, col):
+        for object in sorted(self.object_index.at(col, row),
+                             key=self.draw_order):
             object.draw()
-    player.draw()
-
-    libtcod.console_blit(con, 0, 0, MAP_WIDTH, MAP_HEIGHT, 0, 0, 0)
-
-    # prepare to render the GUI panel
-    libtcod.console_set_default_background(panel, libtcod.black)
-    libtcod.console_clear(panel)
 
-    # show the player's stats
-    render_bar(1, 1, BAR_WIDTH, 'HP', player.fighter.hp, player.fighter.max_hp,
-               libtcod.light_red, libtcod.darker_red)
-
-    # blit the contents of "panel" to the root console
-    libtcod.console_blit(
-        panel,
-        0,
-        0,
-        SCREEN_WIDTH,
-        PANEL_HEIGHT,
-        0,
-        0,
-        PANEL_Y)
+    def update_visibility(self, area):
+        visible = self.fov_map.fov[area]
+        self.dirty.mark_mask(area, visible != self.map.visible[area])
+        self.map.visible[area] = visible
+        self.map.explored[area] |= visible
+
+    def update_fov(self):
+        # Only cells around the old and new light radius can change, and the
+        # sweep is skipped when neither the player nor the map has changed.
+        if not self.fov_recompute:
+            return
+        self.fov_recompute = False
+        with self.profiler.phase('fov'):
+            if fov.map_compute_fov(self.fov_map, self.player.y, self.player.x,
+                                   LIGHT_RADIUS, fov.RECURSIVE_SHADOWCASTING):
+                self.profiler.counts['fov_recomputes'] += 1
+                self.update_visibility(self.fov_map.changed)
+                self.wake_monsters(self.fov_map.bounds)
+
+    def render_all(self, root=0):
+        self.update_fov()
+        with self.profiler.phase('render'):
+            self.draw(root)
+
+    def draw(self, root):
+        camera = self.camera
+        if camera.follow(self.player.x, self.player.y):
+            self.dirty.mark_area(camera.area)
+
+        # Redraw only the cells that changed and push their bounding box.
+        # Tiles go to the console buffers in one step, objects only where
+        # visible.
+        dirty = self.dirty
+        if dirty:
+            self.profiler.counts['cells_redrawn'] += int(
+                dirty.cells[dirty.bounds].sum())
+            draw_tiles(self.con, self.map, dirty.bounds, COLOUR_VISIBLE,
+                       COLOUR_NOT_VISIBLE, mask=dirty.cells[dirty.bounds])
+            for row, col in dirty.where(self.map.visible):
+                self.draw_objects(row, col)
+            rows, cols = region.intersect(dirty.bounds, camera.area)
+            if not region.is_empty((rows, cols)):
+                libtcod.console_blit(self.con, cols.start, rows.start,
+                                     cols.stop - cols.start,
+                                     rows.stop - rows.start, root,
+                                     cols.start - camera.x,
+                                     rows.start - camera.y)
+            dirty.clear()
+
+        fighter = self.player.fighter
+        hp = (fighter.hp, fighter.max_hp)
+        if hp == self.panel_hp and not self.show_profile:
+            return
+        self.panel_hp = hp
+
+        # prepare to render the GUI panel
+        libtcod.console_set_default_background(self.panel, libtcod.black)
+        libtcod.console_clear(self.panel)
+
+        # show the player's stats
+        render_bar(self.panel, 1, 1, BAR_WIDTH, 'HP', fighter.hp,
+                   fighter.max_hp, libtcod.light_red, libtcod.darker_red)
+
+        if self.show_profile:
+            libtcod.console_set_default_foreground(self.panel,
+                                                   libtcod.light_grey)
+            for y, line in enumerate(self.profiler.lines(), 1):
+                libtcod.console_print_ex(self.panel, BAR_WIDTH + 3, y,
+                                         libtcod.BKGND_NONE, libtcod.LEFT,
+                                         line[:SCREEN_WIDTH - BAR_WIDTH - 4])
+
+        # blit the contents of "panel" to the root console
+        libtcod.console_blit(
+            self.panel,
+            0,
+            0,
+            SCREEN_WIDTH,
+            PANEL_HEIGHT,
+            root,
+            0,
+            PANEL_Y)
+
+    # ############################################
+    # Player Functions
+    # ############################################
+
+    def player_attack_move(self, dx, dy):
+        x = self.player.x + dx
+        y = self.player.y + dy
+
+        target = self.object_index.fighter_at(x, y)
+        if target is not None:
+            self.player.fighter.attack(target)
+        else:
+            self.player.move(dx, dy)
+
+    def handle_keys(self, key):
+        self.fov_recompute = True
+
+        if (key.vk == libtcod.KEY_ESCAPE):
+            return "exit"
+        elif (key.vk == libtcod.KEY_ENTER and (key.lalt or key.ralt)):
+            libtcod.console_set_fullscreen(
+                not libtcod.console_is_fullscreen())
+        elif key.vk == libtcod.KEY_F3:
+            self.show_profile = not self.show_profile
+            # Redraw the panel, to clear the overlay when it is turned off.
+            self.panel_hp = None
+
+        if self.game_state == 'playing':
+            if (key.vk == libtcod.KEY_RIGHT or
+                    key.vk == libtcod.KEY_KP6):
+                self.player_attack_move(1, 0)
+            elif (key.vk == libtcod.KEY_LEFT or
+                  key.vk == libtcod.KEY_KP4):
+                self.player_attack_move(-1, 0)
+            elif (key.vk == libtcod.KEY_UP or
+                  key.vk == libtcod.KEY_KP8):
+                self.player_attack_move(0, -1)
+            elif (key.vk == libtcod.KEY_DOWN or
+                  key.vk == libtcod.KEY_KP2):
+                self.player_attack_move(0, 1)
+            elif (key.vk == libtcod.KEY_KP7):
+                self.player_attack_move(-1, -1)
+            elif (key.vk == libtcod.KEY_KP9):
+                self.player_attack_move(1, -1)
+            elif (key.vk == libtcod.KEY_KP1):
+                self.player_attack_move(-1, 1)
+            elif (key.vk == libtcod.KEY_KP3):
+                self.player_attack_move(1, 1)
+            elif (key.vk == libtcod.KEY_KP5):
+                pass
+            else:
+                self.fov_recompute = False
+                return 'skip-turn'
+
+    def play_turn(self, key):
+        with self.profiler.phase('player'):
+            player_action = self.handle_keys(key)
+        if (self.game_state == 'playing' and
+                player_action not in ('exit', 'skip-turn')):
+            with self.profiler.phase('monsters'):
+                self.monster_phase()
+        return player_action
+
+    # ############################################
+    # Monster Functions
+    # ############################################
+
+    def wake_monsters(self, area):
+        """Schedule the dormant monsters in view within area."""
+        scheduler = self.scheduler
+        for object in self.object_index.within(area):
+            if (object.ai and object not in scheduler and
+                    fov.map_is_in_fov(self.fov_map, object.y, object.x)):
+                scheduler.schedule(object, object.ai.delay())
+
+    def monster_phase(self):
+        """Let the monsters due during one player action act, in time order."""
+        scheduler = self.scheduler
+        end = scheduler.time + TURN_TIME
+        while self.game_state == 'playing':
+            actors = scheduler.pop_due(end)
+            if not actors:
+                break
+            self.monster_turns(actors)
+        scheduler.time = end
+
+    def monster_turns(self, actors):
+        """
+        Let actors that are due at the same time act, BasicMonsters together.
+
+        Monsters in view next to the player attack it in turn. The others
+        in view step along the shared distance map together; when two want
+        the same cell, the one earlier in actors gets it. Monsters out of
+        view are not scheduled again and go dormant.
+        """
+        monsters = []
+        for object in actors:
+            if isinstance(object.ai, BasicMonster):
+                monsters.append(object)
+            elif object.ai:
+                object.ai.take_turn()
+                self.scheduler.schedule(object, object.ai.delay())
+        if not monsters:
+            return
+
+        player = self.player
+        ids = np.array([monster.entity[1] for monster in monsters])
+        rows = self.entities.y[ids]
+        cols = self.entities.x[ids]
+        active = self.fov_map.fov[rows, cols]
+        # The same test as distance_to() < 2, without the square root.
+        near = (rows - player.y) ** 2 + (cols - player.x) ** 2 < 4
+
+        movers = np.flatnonzero(active & ~near)
+        if movers.size:
+            self.paths.update(player.y, player.x)
+            far = ~self.paths.covers(rows[movers], cols[movers])
+
+            # Walkers only look at the cells next to them.
+            walkers = movers[~far]
+            area = (slice(max(int(rows[movers].min()) - 1, 0),
+                          int(rows[movers].max()) + 2),
+                    slice(max(int(cols[movers].min()) - 1, 0),
+                          int(cols[movers].max()) + 2))
+            occupied = self.map.blocked[area].copy()
+            top, left = area[0].start, area[1].start
+            for object in self.object_index.within(area):
+                if object.blocks:
+                    occupied[object.y - top, object.x - left] = True
+            new_rows, new_cols = path.step_all(
+                self.paths, rows[walkers], cols[walkers], occupied, area)
+            moved = np.flatnonzero((new_rows != rows[walkers]) |
+                                   (new_cols != cols[walkers]))
+            for i in moved:
+                self.object_index.move(monsters[walkers[i]],
+                                       int(new_cols[i]), int(new_rows[i]))
+            moved_from = walkers[moved]
+            self.dirty.mark_cells(rows[moved_from], cols[moved_from])
+            self.dirty.mark_cells(new_rows[moved], new_cols[moved])
+
+            for i in movers[far]:
+                monsters[i].path_towards(player)
+
+        for i in np.flatnonzero(active & near):
+            if player.fighter.hp >= 0:
+                monsters[i].fighter.attack(player)
+
+        for i in np.flatnonzero(active):
+            self.scheduler.schedule(monsters[i], monsters[i].ai.delay())
+
+
+class ChunkedWorld(World):
+    """
+    A world of WORLD_CHUNKS x WORLD_CHUNKS chunks, played in a window of
+    ACTIVE_CHUNKS x ACTIVE_CHUNKS chunks around the player.
+
+    The map, objects, FOV and paths only cover the window, in its
+    coordinates, and the camera shows the part of it around the player.
+    Once the player comes within the light radius of its edge, the window
+    moves by whole chunks to have the player in the middle chunk again:
+    chunks falling out of it are packed away with their objects, the rest
+    is shifted, and chunks coming in are unpacked or generated.
+    Packed chunks go to directory if given, otherwise they stay in memory.
+    The chunks just outside the window that have never been visited are
+    generated ahead on background, a Background, so the window can move
+    without waiting for them; close() shuts it down. Unlike a World, it
+    cannot be saved to a snapshot or carried on from one.
+    """
+
+    def __init__(self, quiet=False, seed=None, directory=None,
+                 background=None):
+        # Chunks must come out the same when generated at any time.
+        if seed is None:
+            seed = random.getrandbits(32)
+        # Files of other seeds may share the directory.
+        self.chunks = chunks.ChunkStore(directory, 'chunk_%d' % seed)
+        self.background = (background if background is not None
+                           else Background())
+        self.origin = None
+        super().__init__(quiet, seed)
+
+    def map_size(self):
+        return ACTIVE_CHUNKS * CHUNK_SIZE, ACTIVE_CHUNKS * CHUNK_SIZE
+
+    def close(self):
+        self.background.close()
+
+    def make_map(self):
+        self.map = TileMap(self.width, self.height)
+        middle = WORLD_CHUNKS // 2
+        self.origin = self.window_origin(middle, middle)
+        for key in self.window():
+            level = self.load_chunk(*key)
+            if key == (middle, middle):
+                start = self.start_cell(middle, middle, level)
+        self.object_index.move(self.player, *start)
+        self.prefetch()
+
+    def start_cell(self, chunk_x, chunk_y, level=None):
+        """
+        The x, y the player starts at in a chunk of the window.
+
+        That is the start of the chunk's level or, if something stands
+        there, as it may in a chunk packed by an earlier game, the free
+        cell nearest to it. level is the one load_chunk() returned, if it
+        generated the chunk; otherwise it is generated again for its start.
+        """
+        rows, cols = self.chunk_area(chunk_x, chunk_y)
+        if level is None:
+            level = generate(*self.chunk_params(chunk_x, chunk_y))
+        start_x, start_y = level.start
+        free = ~self.map.blocked[rows, cols]
+        for object in self.object_index.within((rows, cols)):
+            if object.blocks and object is not self.player:
+                free[object.y - rows.start, object.x - cols.start] = False
+        cells = np.argwhere(free)
+        nearest = np.abs(cells - (start_y, start_x)).max(axis=1).argmin()
+        row, col = cells[nearest].tolist()
+        return cols.start + col, rows.start + row
+
+    def window_origin(self, chunk_x, chunk_y):
+        """The first chunk of a window around chunk_x, chunk_y."""
+        last = WORLD_CHUNKS - ACTIVE_CHUNKS
+        return (min(max(chunk_x - ACTIVE_CHUNKS // 2, 0), last),
+                min(max(chunk_y - ACTIVE_CHUNKS // 2, 0), last))
+
+    def window(self):
+        """The (x, y) of every chunk in the window."""
+        origin_x, origin_y = self.origin
+        return {(origin_x + dx, origin_y + dy)
+                for dy in range(ACTIVE_CHUNKS) for dx in range(ACTIVE_CHUNKS)}
+
+    def chunk_area(self, chunk_x, chunk_y):
+        """The (rows, cols) region of the map a chunk in the window covers."""
+        top = (chunk_y - self.origin[1]) * CHUNK_SIZE
+        left = (chunk_x - self.origin[0]) * CHUNK_SIZE
+        return (slice(top, top + CHUNK_SIZE), slice(left, left + CHUNK_SIZE))
+
+    def chunk_params(self, chunk_x, chunk_y):
+        """The arguments to generate() a chunk from."""
+        return (hash((self.seed, chunk_x, chunk_y)), CHUNK_SIZE, CHUNK_SIZE,
+                CHUNK_ROOMS, ROOM_MIN_SIZE, ROOM_MAX_SIZE, MAX_ROOM_MONSTERS,
+                chunks.exits(CHUNK_SIZE, chunk_x, chunk_y, WORLD_CHUNKS,
+                             WORLD_CHUNKS))
+
+    def prefetch(self):
+        """Generate the new chunks around the window in the background."""
+        origin_x, origin_y = self.origin
+        window = self.window()
+        around = {('chunk', x, y)
+                  for y in range(max(origin_y - 1, 0),
+                                 min(origin_y + ACTIVE_CHUNKS + 1,
+                                     WORLD_CHUNKS))
+                  for x in range(max(origin_x - 1, 0),
+                                 min(origin_x + ACTIVE_CHUNKS + 1,
+                                     WORLD_CHUNKS))
+                  if (x, y) not in window and (x, y) not in self.chunks}
+        background = self.background
+        for key in background:
+            if key[0] == 'chunk' and key not in around:
+                background.discard(key)
+        for key in around:
+            background.submit(key, generate, *self.chunk_params(*key[1:]))
+
+    def load_chunk(self, chunk_x, chunk_y):
+        """
+        Put a chunk and its objects into the window.
+
+        Returns the level if the chunk had to be generated, else None.
+        """
+        area = self.chunk_area(chunk_x, chunk_y)
+        rows, cols = area
+        key = (chunk_x, chunk_y)
+        if key in self.chunks:
+            tiles, _, records = self.chunks.get(key, CHUNK_STATE, RECORD)
+            for name in savefile.PLANES:
+                getattr(self.map, name)[area] = getattr(tiles, name)
+            records = records.copy()
+            records['x'] += cols.start
+            records['y'] += rows.start
+            self.add_records(records)
+            return None
+
+        if ('chunk',) + key in self.background:
+            level = self.background.take(('chunk',) + key)
+        else:
+            level = generate(*self.chunk_params(chunk_x, chunk_y))
+        self.map.blocked[area] = level.blocked
+        self.map.blocked_sight[area] = level.blocked_sight
+        self.map.explored[area] = False
+        self.map.visible[area] = False
+        for x, y in level.monsters.tolist():
+            self.place_monster(cols.start + x, rows.start + y)
+        return level
+
+    def unload_chunk(self, chunk_x, chunk_y):
+        """Pack a chunk away; return the objects on it, still in the world."""
+        area = self.chunk_area(chunk_x, chunk_y)
+        rows, cols = area
+        tiles = TileMap(CHUNK_SIZE, CHUNK_SIZE)
+        for name in savefile.PLANES:
+            getattr(tiles, name)[:] = getattr(self.map, name)[area]
+        objects = list(self.object_index.within(area))
+        records = self.object_records(objects)
+        records['x'] -= cols.start
+        records['y'] -= rows.start
+        # Out of view, so dormant once back.
+        records['order'] = -1
+        state = np.zeros((), dtype=CHUNK_STATE)
+        state['x'] = chunk_x
+        state['y'] = chunk_y
+        self.chunks.put((chunk_x, chunk_y), tiles, state, records)
+        return objects
+
+    def update_fov(self):
+        with self.profiler.phase('recentre'):
+            self.recentre()
+        super().update_fov()
+
+    def recentre(self):
+        """Move the window if the player nears its edge; True if moved."""
+        player = self.player
+        # Not as soon as the player leaves the middle chunk, or walking to
+        # and fro over its edge would move the window every turn.
+        if min(player.x, player.y, self.width - 1 - player.x,
+               self.height - 1 - player.y) >= LIGHT_RADIUS:
+            return False
+        origin = self.window_origin(
+            self.origin[0] + player.x // CHUNK_SIZE,
+            self.origin[1] + player.y // CHUNK_SIZE)
+        if origin == self.origin:
+            return False
+
+        old = self.window()
+        gone = set()
+        for key in old:
+            if not (0 <= key[0] - origin[0] < ACTIVE_CHUNKS and
+                    0 <= key[1] - origin[1] < ACTIVE_CHUNKS):
+                for object in self.unload_chunk(*key):
+                    gone.add(id(object))
+                    self.entities.remove(object.entity[1])
+                    object.world = None
+        self.objects = [object for object in self.objects
+                        if id(object) not in gone]
+        scheduler = self.scheduler
+        scheduler.restore(scheduler.time, scheduler.order,
+                          [entry for entry in scheduler.queue
+                           if id(entry[2]) not in gone])
+
+        # Shift what is left over; chunks coming in overwrite the rest.
+        dx = (origin[0] - self.origin[0]) * CHUNK_SIZE
+        dy = (origin[1] - self.origin[1]) * CHUNK_SIZE
+        for name in savefile.PLANES:
+            plane = getattr(self.map, name)
+            plane[:] = np.roll(plane, (-dy, -dx), axis=(0, 1))
+        ids = np.array([object.entity[1] for object in self.objects])
+        self.entities.x[ids] -= dx
+        self.entities.y[ids] -= dy
+        self.object_index = SpatialIndex()
+        for object in self.objects:
+            self.object_index.add(object)
+
+        self.origin = origin
+        for key in self.window() - old:
+            self.load_chunk(*key)
+        self.prefetch()
+
+        self.map.visible[:] = False
+        self.paths = path.DistanceMap(self.map.blocked, PATH_RADIUS)
+        self.fov_map = self.make_fov_map()
+        self.fov_recompute = True
+        libtcod.console_clear(self.con)
+        self.dirty.mark_area((slice(0, self.height), slice(0, self.width)))
+        return True
 
 
 # ############################################
@@ -419,15 +1039,18 @@ def render_all():
 
 
 def player_death(player):
-    global game_state
-    print("You died!")
-    game_state = 'dead'
+    world = player.world
+    world.message("You died!")
+    world.game_state = 'dead'
     player.char = '%'
     player.colour = PLAYER_DEATH_COLOUR
+    world.dirty.mark(player.x, player.y)
 
 
 def monster_death(monster):
-    print(monster.name.capitalize() + " is dead!")
+    world = monster.world
+    world.kills += 1
+    world.message(monster.name.capitalize() + " is dead!")
     monster.char = '%'
     monster.colour = MONSTER_DEATH_COLOUR
     monster.blocks = False
@@ -435,112 +1058,135 @@ def monster_death(monster):
     monster.ai = None
     monster.name = "remains of " + monster.name
     monster.send_to_back()
+    world.dirty.mark(monster.x, monster.y)
 
 
-# ############################################
-# Player Functions
-# ############################################
-
-
-def player_attack_move(dx, dy):
-    x = player.x + dx
-    y = player.y + dy
-
-    target = None
-    for object in objects:
-        if object.fighter and object.x == x and object.y == y:
-            target = object
-            break
+# Death functions by the number a snapshot stores for them.
+DEATH_FUNCTIONS = (None, player_death, monster_death)
 
-    if target is not None:
-        player.fighter.attack(target)
-    else:
-        player.move(dx, dy)
-
-
-def handle_keys():
-    global fov_recompute
-    fov_recompute = True
-
-    key = libtcod.console_wait_for_keypress(True)
-    if (key.vk == libtcod.KEY_ESCAPE):
-        return "exit"
-    elif (key.vk == libtcod.KEY_ENTER and (key.lalt or key.ralt)):
-        libtcod.console_set_fullscreen(not libtcod.console_is_fullscreen())
-
-    if game_state == 'playing':
-        if (key.vk == libtcod.KEY_RIGHT or
-                key.vk == libtcod.KEY_KP6):
-            player_attack_move(1, 0)
-        elif (key.vk == libtcod.KEY_LEFT or
-              key.vk == libtcod.KEY_KP4):
-            player_attack_move(-1, 0)
-        elif (key.vk == libtcod.KEY_UP or
-              key.vk == libtcod.KEY_KP8):
-            player_attack_move(0, -1)
-        elif (key.vk == libtcod.KEY_DOWN or
-              key.vk == libtcod.KEY_KP2):
-            player_attack_move(0, 1)
-        elif (key.vk == libtcod.KEY_KP7):
-            player_attack_move(-1, -1)
-        elif (key.vk == libtcod.KEY_KP9):
-            player_attack_move(1, -1)
-        elif (key.vk == libtcod.KEY_KP1):
-            player_attack_move(-1, 1)
-        elif (key.vk == libtcod.KEY_KP3):
-            player_attack_move(1, 1)
-        elif (key.vk == libtcod.KEY_KP5):
-            pass
-        else:
-            fov_recompute = False
-            return 'skip-turn'
+# Layout of a snapshot: the state of the world, and a record per object of
+# its entity and what its components are made from. speed is 0 for objects
+# without AI, and order -1 for objects not scheduled to act.
+STATE = np.dtype([('time', '<i8'), ('order', '<i8'), ('kills', '<i4'),
+                  ('player', '<u4'), ('game_state', 'S8')])
+RECORD = record_dtype(('name', 'S32'), ('fighter', '?'), ('death', 'u1'),
+                      ('speed', '<i4'), ('due', '<i8'), ('order', '<i8'))
+# The state of a packed chunk of a ChunkedWorld is just where it belongs.
+CHUNK_STATE = np.dtype([('x', '<i4'), ('y', '<i4')])
 
 
 # ############################################
 # Initialisation and Main Loop
 # ############################################
 
-libtcod.console_set_custom_font(b"res/terminal10x16_gs_ro.png",
-                                libtcod.FONT_LAYOUT_ASCII_INROW |
-                                libtcod.FONT_TYPE_GREYSCALE)
-libtcod.console_init_root(SCREEN_WIDTH, SCREEN_HEIGHT, b"Hello World",
-                          renderer=libtcod.RENDERER_SDL)
-con = libtcod.console_new(MAP_WIDTH, MAP_HEIGHT)
-panel = libtcod.console_new(SCREEN_WIDTH, PANEL_HEIGHT)
-libtcod.console_set_default_background(con, libtcod.Color(0, 0, 0))
-libtcod.console_set_default_foreground(con, libtcod.Color(127, 127, 127))
-libtcod.console_clear(con)
-
-fighter_component = Fighter(
-    hp=PLAYER_HP,
-    defense=PLAYER_DEFENSE,
-    power=PLAYER_POWER,
-    death_function=player_death)
-player = Object(0, 0, '@', 'player', libtcod.Color(127, 127, 127), blocks=True,
-                fighter=fighter_component)
-objects = [player]
-
-make_map()
-
-fov_map = fov.map_new(MAP_WIDTH, MAP_HEIGHT)
-for row in range(MAP_HEIGHT):
-    for col in range(MAP_WIDTH):
-        fov.map_set_properties(fov_map, row, col, map[row][col].blocked_sight)
-
-fov_recompute = True
-game_state = 'playing'
-player_action = None
-
-while not libtcod.console_is_window_closed():
-    render_all()
-    libtcod.console_flush()
-    for object in objects:
-        object.clear()
-    player_action = handle_keys()
-    if player_action == "exit":
-        break
-
-    if game_state == 'playing' and player_action != 'skip-turn':
-        for object in objects:
-            if object.ai:
-                object.ai.take_turn()
+
+def main(snapshot=None, chunked=False, directory=None, overlay=False,
+         profile=None):
+    libtcod.console_set_custom_font(b"res/terminal10x16_gs_ro.png",
+                                    libtcod.FONT_LAYOUT_ASCII_INROW |
+                                    libtcod.FONT_TYPE_GREYSCALE)
+    libtcod.console_init_root(SCREEN_WIDTH, SCREEN_HEIGHT, b"Hello World",
+                              renderer=libtcod.RENDERER_SDL)
+    if chunked:
+        world = ChunkedWorld(directory=directory)
+    else:
+        world = World(snapshot=snapshot)
+    world.show_profile = overlay
+
+    def handle_key(key):
+        # Monsters act on the FOV, and keys can come faster than frames, so
+        # it is brought up to date before every turn.
+        world.update_fov()
+        return world.play_turn(key)
+
+    Loop(handle_key, render=world.render_all, profiler=world.profiler).run()
+    world.close()
+    if profile:
+        world.profiler.export(profile)
+
+
+def run_headless(world, turns, keys, render=False):
+    """
+    Play up to turns turns of world with keys from an input source.
+
+    With render set, frames are drawn to an offscreen root console;
+    otherwise only the FOV is updated between turns.
+    Returns the number of turns played and the time they took.
+    """
+    root = libtcod.console_new(SCREEN_WIDTH, SCREEN_HEIGHT) if render else 0
+
+    played = 0
+    start = time.perf_counter()
+    for key in keys:
+        if played == turns or world.game_state != 'playing':
+            break
+        with world.profiler.frame():
+            # Monsters act on the FOV, so it is kept up to date either way.
+            if render:
+                world.render_all(root)
+            else:
+                world.update_fov()
+            action = world.play_turn(key)
+        if action == "exit":
+            break
+        played += 1
+    return played, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+                        help="run the turn logic without a window")
+    parser.add_argument('--turns', type=int, default=1000,
+                        help="maximum number of turns to play headless")
+    parser.add_argument('--seed', type=int,
+                        help="seed for map generation and random input")
+    parser.add_argument('--keys',
+                        help="file of whitespace separated key names, "
+                             "e.g. KP6 UP, to play instead of random input")
+    parser.add_argument('--render', action='store_true',
+                        help="draw every headless frame offscreen")
+    parser.add_argument('--load', metavar='PATH',
+                        help="carry on from a snapshot instead of a new map")
+    parser.add_argument('--save', metavar='PATH',
+                        help="write a snapshot after the headless run")
+    parser.add_argument('--chunked', action='store_true',
+                        help="play a world of %dx%d chunks streamed around "
+                             "the player" % (WORLD_CHUNKS, WORLD_CHUNKS))
+    parser.add_argument('--chunks', metavar='DIR',
+                        help="directory to pack chunks away to, rather than "
+                             "memory")
+    parser.add_argument('--overlay', action='store_true',
+                        help="show frame times and counts on the panel; F3 "
+                             "toggles it")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write phase times, frame percentiles and "
+                             "counts to PATH as JSON at the end")
+    args = parser.parse_args()
+    if args.chunked and (args.load or args.save):
+        parser.error("chunked worlds cannot be loaded or saved")
+
+    if not args.headless:
+        main(args.load, args.chunked, args.chunks, args.overlay,
+             args.profile)
+    else:
+        if args.keys:
+            with open(args.keys) as f:
+                keys = scripted_keys(f.read().split())
+        else:
+            keys = random_keys(args.seed)
+        if args.chunked:
+            world = ChunkedWorld(quiet=True, seed=args.seed,
+                                 directory=args.chunks)
+        else:
+            world = World(quiet=True, seed=args.seed, snapshot=args.load)
+        world.show_profile = args.overlay
+        played, elapsed = run_headless(world, args.turns, keys, args.render)
+        print("%d turns in %.3fs: %.0f turns/s, game %s" % (
+            played, elapsed, played / elapsed if elapsed else 0,
+            world.game_state))
+        if args.save:
+            world.save(args.save)
+        if args.profile:
+            world.profiler.export(args.profile)
+        world.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Play many seeded headless games of basic3 across a process pool.
+
+Every game is played in its own World, so a worker process can run any
+number of them one after another. Constants such as TROLL_POWER can be
+overridden for every game to compare balancing changes. Levels are cached
+by each worker and, with --levels, on disk, so repeated runs over the same
+seeds do not generate them again.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import os
+import statistics
+import time
+
+import basic3
+from lib.headless import random_keys
+from lib.level import LevelCache
+
+Outcome = collections.namedtuple(
+    'Outcome', ['seed', 'turns', 'kills', 'died', 'seconds'])
+
+# Levels of the games played in this process, set up by setup_worker().
+levels = LevelCache()
+
+
+def setup_worker(overrides, directory=None):
+    global levels
+    for name, value in overrides.items():
+        setattr(basic3, name, value)
+    levels = LevelCache(directory=directory)
+
+
+def play_game(seed, turns):
+    start = time.perf_counter()
+    world = basic3.World(quiet=True, seed=seed, levels=levels)
+    played, _ = basic3.run_headless(world, turns, random_keys(seed))
+    return Outcome(seed, played, world.kills, world.game_state == 'dead',
+                   time.perf_counter() - start)
+
+
+def run_batch(games, turns, seed=0, workers=None, overrides=None,
+              directory=None):
+    """
+    Play games games of at most turns turns; return their outcomes.
+
+    Levels are kept in directory, if given.
+    """
+    workers = workers or os.cpu_count()
+    seeds = range(seed, seed + games)
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=setup_worker,
+            initargs=(overrides or {}, directory)) as pool:
+        return list(pool.map(play_game, seeds, [turns] * games,
+                             chunksize=max(1, games // (4 * workers))))
+
+
+def summarise(outcomes, elapsed):
+    turns = [outcome.turns for outcome in outcomes]
+    kills = [outcome.kills for outcome in outcomes]
+    return collections.OrderedDict([
+        ('games', len(outcomes)),
+        ('deaths', sum(outcome.died for outcome in outcomes)),
+        ('turns_mean', statistics.mean(turns)),
+        ('turns_min', min(turns)),
+        ('turns_max', max(turns)),
+        ('kills_mean', statistics.mean(kills)),
+        ('kills_max', max(kills)),
+        ('game_seconds_mean',
+         statistics.mean(outcome.seconds for outcome in outcomes)),
+        ('wall_seconds', elapsed),
+        ('games_per_second', len(outcomes) / elapsed),
+    ])
+
+
+def parse_override(text):
+    name, _, value = text.partition('=')
+    if not hasattr(basic3, name):
+        raise argparse.ArgumentTypeError("unknown constant: " + name)
+    return name, int(value)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--turns', type=int, default=1000,
+                        help="maximum number of turns per game")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the first game, the rest follow on")
+    parser.add_argument('--workers', type=int,
+                        help="number of processes, defaults to one per core")
+    parser.add_argument('--set', type=parse_override, action='append',
+                        default=[], metavar='NAME=VALUE',
+                        help="override a basic3 constant, e.g. TROLL_POWER=4")
+    parser.add_argument('--levels', metavar='DIR',
+                        help="directory to keep generated levels in")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    outcomes = run_batch(args.games, args.turns, args.seed, args.workers,
+                         dict(args.set), args.levels)
+    summary = summarise(outcomes, time.perf_counter() - start)
+    for name, value in summary.items():
+        if isinstance(value, float):
+            print("%-18s %.3f" % (name, value))
+        else:
+            print("%-18s %d" % (name, value))
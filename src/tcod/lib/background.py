@@ -0,0 +1,55 @@
+"""
+Work done on other threads while the game goes on.
+
+Jobs are pure functions of their arguments, such as generating a level
+from its seed, so that they can run while the main thread plays and draws
+without either seeing the other half way. Each job has a key, by which it
+is asked for again, waited for or dropped.
+"""
+
+import concurrent.futures
+
+
+class Background:
+    """
+    Jobs by key, run on a pool of worker threads.
+
+    A job is started ahead of time with submit() and its result collected
+    with take(), which only waits if the job has not finished by then.
+    Jobs that turn out not to be needed are dropped with discard(); their
+    results are thrown away.
+    """
+
+    def __init__(self, workers=1):
+        self.pool = concurrent.futures.ThreadPoolExecutor(workers)
+        self.jobs = {}
+
+    def __contains__(self, key):
+        return key in self.jobs
+
+    def __iter__(self):
+        return iter(list(self.jobs))
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def submit(self, key, function, *args):
+        """Start function(*args) as the job for key, unless there is one."""
+        if key not in self.jobs:
+            self.jobs[key] = self.pool.submit(function, *args)
+
+    def take(self, key):
+        """Return the result of the job for key, waiting for it if need be."""
+        return self.jobs.pop(key).result()
+
+    def discard(self, key):
+        """Drop the job for key, if there is one."""
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def close(self):
+        """Drop every job and stop the workers."""
+        for key in list(self.jobs):
+            self.discard(key)
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,71 @@
+"""
+Chunks of a world too large to keep loaded whole.
+
+The world is cut into square chunks of the same size, addressed by their
+(x, y) in chunks. Only those around the player are loaded; the rest are
+generated when first needed and packed away with savefile when left, so
+memory and turn time depend on the view distance rather than on the size
+of the world.
+"""
+
+import os
+
+from . import savefile
+
+# Offsets (dx, dy) of the chunks sharing an edge with a chunk.
+SIDES = ((0, -1), (-1, 0), (1, 0), (0, 1))
+
+
+def exits(size, chunk_x, chunk_y, width, height):
+    """
+    Return the cells on the edges of a chunk that tunnels lead out from.
+
+    There is one in the middle of every edge shared with another chunk of
+    a world width x height chunks large, next to the matching one of that
+    chunk, so chunks generated separately join up.
+    """
+    middle = size // 2
+    cells = {(0, -1): (middle, 0), (-1, 0): (0, middle),
+             (1, 0): (size - 1, middle), (0, 1): (middle, size - 1)}
+    return tuple(cells[dx, dy] for dx, dy in SIDES
+                 if 0 <= chunk_x + dx < width and 0 <= chunk_y + dy < height)
+
+
+class ChunkStore:
+    """
+    Chunks that are not loaded, as savefile snapshots by (x, y).
+
+    Snapshots are kept in memory as bytes or, with directory set, in files
+    there, one per chunk, so that memory does not grow with the number of
+    chunks visited either. Files are named after name and the chunk, so
+    stores of different worlds can share a directory under different
+    names. The directory is created if need be.
+    """
+
+    def __init__(self, directory=None, name='chunk'):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.name = name
+        self.packed = {}
+
+    def path(self, key):
+        return os.path.join(self.directory,
+                            '%s_%d_%d.sav' % ((self.name,) + key))
+
+    def __contains__(self, key):
+        if self.directory:
+            return os.path.exists(self.path(key))
+        return key in self.packed
+
+    def put(self, key, tiles, state, records):
+        if self.directory:
+            savefile.save(self.path(key), tiles, state, records)
+        else:
+            self.packed[key] = savefile.pack(tiles, state, records)
+
+    def get(self, key, state_dtype, record_dtype):
+        """Return the tiles, state and records last put for key."""
+        if self.directory:
+            return savefile.load(self.path(key), state_dtype, record_dtype)
+        return savefile.unpack(self.packed[key], state_dtype, record_dtype)
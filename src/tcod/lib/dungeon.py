@@ -0,0 +1,89 @@
+"""
+Rooms joined by tunnels, carved into the planes of a TileMap.
+
+Carving clears blocked and blocked_sight with slice assignment, one room
+or tunnel at a time.
+"""
+
+import random
+
+import numpy as np
+
+
+class Rect:
+    """Represents a rectangle on the map. Used to characterise a room."""
+
+    def __init__(self, x, y, w, h):
+        self.x1 = x
+        self.y1 = y
+        self.x2 = x + w
+        self.y2 = y + h
+
+    def centre(self):
+        centre_x = (self.x1 + self.x2) // 2
+        centre_y = (self.y1 + self.y2) // 2
+        return (centre_x, centre_y)
+
+    def intersect(self, other):
+        return (self.x1 <= other.x2 and self.x2 >= other.x1 and
+                self.y1 <= other.y2 and self.y2 >= other.y1)
+
+
+def carve_room(tiles, room):
+    tiles.blocked[room.y1:room.y2, room.x1:room.x2] = False
+    tiles.blocked_sight[room.y1:room.y2, room.x1:room.x2] = False
+
+
+def carve_h_tunnel(tiles, x1, x2, row):
+    cols = slice(min(x1, x2), max(x1, x2) + 1)
+    tiles.blocked[row, cols] = False
+    tiles.blocked_sight[row, cols] = False
+
+
+def carve_v_tunnel(tiles, y1, y2, col):
+    rows = slice(min(y1, y2), max(y1, y2) + 1)
+    tiles.blocked[rows, col] = False
+    tiles.blocked_sight[rows, col] = False
+
+
+def carve_rooms(tiles, max_rooms, min_size, max_size, rng=random):
+    """
+    Try max_rooms random rooms, carve those that fit and yield each of them.
+
+    A room is rejected if it intersects an earlier one. Rather than testing
+    every earlier room, an occupancy plane holds the extent of all rooms so
+    far, so a try costs the area of the room. Every room after the first is
+    joined to the one before by a tunnel, carved when the generator is
+    resumed; random numbers the caller draws for a room are therefore
+    drawn between those of the room and its tunnel.
+    """
+    height, width = tiles.shape
+    # Rect.intersect() compares corners inclusively, so x2 and y2 are part
+    # of the extent even though they are not carved.
+    taken = np.zeros((height, width), dtype=np.bool_)
+    previous = None
+    for i in range(max_rooms):
+        w = rng.randint(min_size, max_size)
+        h = rng.randint(min_size, max_size)
+        x = rng.randint(1, width - w - 1)
+        y = rng.randint(1, height - h - 1)
+        room = Rect(x, y, w, h)
+
+        extent = (slice(room.y1, room.y2 + 1), slice(room.x1, room.x2 + 1))
+        if taken[extent].any():
+            continue
+        taken[extent] = True
+
+        carve_room(tiles, room)
+        yield room
+
+        if previous is not None:
+            (new_x, new_y) = room.centre()
+            (prev_x, prev_y) = previous.centre()
+            if rng.randint(0, 1) == 0:
+                carve_h_tunnel(tiles, prev_x, new_x, prev_y)
+                carve_v_tunnel(tiles, prev_y, new_y, new_x)
+            else:
+                carve_v_tunnel(tiles, prev_y, new_y, prev_x)
+                carve_h_tunnel(tiles, prev_x, new_x, new_y)
+        previous = room
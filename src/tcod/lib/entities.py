@@ -0,0 +1,124 @@
+import numpy as np
+
+# Columns of an EntityStore: name, dtype and shape of one entry.
+COLUMNS = (
+    ('x', np.int32, ()),
+    ('y', np.int32, ()),
+    ('char', np.int32, ()),
+    ('colour', np.uint8, (3,)),
+    ('blocks', np.bool_, ()),
+    ('hp', np.int32, ()),
+    ('max_hp', np.int32, ()),
+    ('power', np.int32, ()),
+    ('defense', np.int32, ()),
+    ('alive', np.bool_, ()),
+)
+
+
+def record_dtype(*extra):
+    """
+    Structured dtype of one entity for saving: its columns, little-endian,
+    followed by the extra (name, dtype) fields given.
+    """
+    fields = [(name, np.dtype(dtype).newbyteorder('<'), shape)
+              for name, dtype, shape in COLUMNS]
+    return np.dtype(fields + list(extra))
+
+
+class EntityStore:
+    """
+    Entity data as one NumPy array per column, indexed by entity id.
+
+    Ids of removed entities are reused. Columns are replaced by larger ones
+    as the store grows, so they must be looked up again after add() rather
+    than kept.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.size = 0
+        self.free = []
+        for name, dtype, shape in COLUMNS:
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def __len__(self):
+        return self.size - len(self.free)
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, dtype, shape in COLUMNS:
+            column = np.zeros((self.capacity,) + shape, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+    def add(self, **values):
+        """Add an entity with the given column values; return its id."""
+        if self.free:
+            id = self.free.pop()
+            for name, dtype, shape in COLUMNS:
+                getattr(self, name)[id] = values.get(name, 0)
+        else:
+            # Rows past size have never been used and are still zero.
+            if self.size == self.capacity:
+                self._grow()
+            id = self.size
+            self.size += 1
+            for name, value in values.items():
+                getattr(self, name)[id] = value
+        self.alive[id] = True
+        return id
+
+    def extend(self, records):
+        """
+        Add an entity per record of a structured array with fields named
+        after the columns; return their ids.
+
+        Free ids are used first, as by add().
+        """
+        count = len(records)
+        reused = min(count, len(self.free))
+        fresh = count - reused
+        while self.size + fresh > self.capacity:
+            self._grow()
+        ids = np.empty(count, dtype=np.intp)
+        if reused:
+            ids[:reused] = self.free[-reused:][::-1]
+            del self.free[-reused:]
+        ids[reused:] = np.arange(self.size, self.size + fresh)
+        self.size += fresh
+        for name, _, _ in COLUMNS:
+            getattr(self, name)[ids] = records[name]
+        self.alive[ids] = True
+        return ids
+
+    def records(self, ids, dtype):
+        """Return the entities with the given ids as records of dtype."""
+        records = np.zeros(len(ids), dtype=dtype)
+        for name, _, _ in COLUMNS:
+            records[name] = getattr(self, name)[ids]
+        return records
+
+    def remove(self, id):
+        self.alive[id] = False
+        self.free.append(id)
+
+    def row(self, id):
+        """Return the column values of an entity, as taken by add()."""
+        return {name: getattr(self, name)[id] for name, _, _ in COLUMNS}
+
+
+def column_property(name):
+    """
+    A property reading and writing one column of an entity.
+
+    The owning class provides entity, a (store, id) pair.
+    """
+    def fget(self):
+        store, id = self.entity
+        return getattr(store, name)[id].item()
+
+    def fset(self, value):
+        store, id = self.entity
+        getattr(store, name)[id] = value
+
+    return property(fget, fset)
@@ -0,0 +1,87 @@
+"""
+Field of view on a grid, with a libtcod-like interface.
+
+Cells are addressed (row, col). The FOV map holds a transparency plane and
+the visibility mask produced by the last map_compute_fov() call. Only the
+window of the light radius around the origin is cleared and recomputed, and
+a call with the same origin, radius and map version is skipped entirely.
+"""
+
+import numpy as np
+
+from . import recursive, region, vectorized
+
+# FOV algorithms.
+RECURSIVE_SHADOWCASTING = 'recursive_shadowcasting'
+VECTORIZED_SHADOWCASTING = 'vectorized_shadowcasting'
+
+ALGORITHMS = {
+    RECURSIVE_SHADOWCASTING: recursive.compute_fov,
+    VECTORIZED_SHADOWCASTING: vectorized.compute_fov,
+}
+
+
+class FovMap:
+    """Transparency of each cell and the cells currently in view."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.transparent = np.zeros((height, width), dtype=np.bool_)
+        self.fov = np.zeros((height, width), dtype=np.bool_)
+
+        # Bumped whenever the transparency of a cell changes.
+        self.version = 0
+        # Region that may hold cells in view, and the region whose cells
+        # may have changed state during the last computation.
+        self.bounds = region.EMPTY
+        self.changed = region.EMPTY
+        self.key = None
+
+
+def map_new(width, height):
+    return FovMap(width, height)
+
+
+def map_from_blocked_sight(blocked_sight):
+    """Return a FOV map seeing through the cells not set in blocked_sight."""
+    height, width = blocked_sight.shape
+    fov_map = FovMap(width, height)
+    np.logical_not(blocked_sight, out=fov_map.transparent)
+    return fov_map
+
+
+def map_set_properties(fov_map, row, col, blocked_sight):
+    if fov_map.transparent[row, col] == blocked_sight:
+        fov_map.transparent[row, col] = not blocked_sight
+        fov_map.version += 1
+
+
+def map_compute_fov(fov_map, row, col, radius=0,
+                    algo=RECURSIVE_SHADOWCASTING):
+    """
+    Compute the cells in view from row, col.
+
+    Returns False without doing any work if nothing changed since the last
+    call, otherwise True; fov_map.changed then covers every cell whose state
+    may differ from before.
+    """
+    # A radius of 0 means no limit, as in libtcod.
+    if radius <= 0:
+        radius = max(fov_map.width, fov_map.height)
+
+    key = (row, col, radius, algo, fov_map.version)
+    if key == fov_map.key:
+        return False
+
+    bounds, _ = region.window(fov_map.fov.shape, row, col, radius)
+    fov_map.fov[fov_map.bounds] = False
+    ALGORITHMS[algo](fov_map.transparent, row, col, radius, fov_map.fov)
+    fov_map.changed = region.union(fov_map.bounds, bounds)
+    fov_map.bounds = bounds
+    fov_map.key = key
+    return True
+
+
+def map_is_in_fov(fov_map, row, col):
+    return bool(fov_map.fov[row, col])
@@ -0,0 +1,71 @@
+"""
+Reference recursive shadowcasting, one octant at a time.
+
+Each octant is scanned row by row moving away from the origin. A run of
+walls splits the lit slope window: the part above the run is scanned by a
+recursive call, the part below continues in the current loop. Once the
+window closes (start < end) the scan stops, so no light leaks past a wall
+through an inverted window.
+"""
+
+import numpy as np
+
+# Multipliers (xx, xy, yx, yy) that map octant coordinates onto the map.
+OCTANTS = ((1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1))
+
+
+def compute_fov(transparent, row, col, radius, fov=None):
+    """Return a boolean mask of the cells of transparent seen from row, col."""
+    if fov is None:
+        fov = np.zeros(transparent.shape, dtype=np.bool_)
+    fov[row, col] = True
+    for xx, xy, yx, yy in OCTANTS:
+        _cast_light(transparent, fov, row, col, 1, 1.0, 0.0, radius,
+                    xx, xy, yx, yy)
+    return fov
+
+
+def _cast_light(transparent, fov, row, col, depth, start, end, radius,
+                xx, xy, yx, yy):
+    if start < end:
+        return
+
+    height, width = transparent.shape
+    radius_squared = radius * radius
+    new_start = start
+    for j in range(depth, radius + 1):
+        dx = -j - 1
+        dy = -j
+        blocked = False
+        while dx <= 0:
+            dx += 1
+            x = col + dx * xx + dy * xy
+            y = row + dx * yx + dy * yy
+            l_slope = (dx - 0.5) / (dy + 0.5)
+            r_slope = (dx + 0.5) / (dy - 0.5)
+            if start < r_slope:
+                continue
+            elif end > l_slope:
+                break
+
+            inside = 0 <= y < height and 0 <= x < width
+            if inside and dx * dx + dy * dy < radius_squared:
+                fov[y, x] = True
+
+            wall = not inside or not transparent[y, x]
+            if blocked:
+                if wall:
+                    new_start = r_slope
+                else:
+                    blocked = False
+                    start = new_start
+                    if start < end:
+                        break
+            elif wall and j < radius:
+                blocked = True
+                _cast_light(transparent, fov, row, col, j + 1, start, l_slope,
+                            radius, xx, xy, yx, yy)
+                new_start = r_slope
+        if blocked or start < end:
+            break
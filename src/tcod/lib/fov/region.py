@@ -0,0 +1,38 @@
+"""Rectangular regions of the map, as (rows, cols) pairs of slices."""
+
+EMPTY = (slice(0, 0), slice(0, 0))
+
+
+def window(shape, row, col, radius):
+    """Return the map slices around row, col and the matching window slices."""
+    height, width = shape
+    top, left = row - radius, col - radius
+    rows = slice(max(top, 0), min(row + radius + 1, height))
+    cols = slice(max(left, 0), min(col + radius + 1, width))
+    local = (slice(rows.start - top, rows.stop - top),
+             slice(cols.start - left, cols.stop - left))
+    return (rows, cols), local
+
+
+def is_empty(region):
+    rows, cols = region
+    return rows.start >= rows.stop or cols.start >= cols.stop
+
+
+def union(a, b):
+    """Return the smallest region covering both a and b."""
+    if is_empty(a):
+        return b
+    if is_empty(b):
+        return a
+    return (slice(min(a[0].start, b[0].start), max(a[0].stop, b[0].stop)),
+            slice(min(a[1].start, b[1].start), max(a[1].stop, b[1].stop)))
+
+
+def intersect(a, b):
+    """Return the region covered by both a and b, possibly empty."""
+    rows = slice(max(a[0].start, b[0].start), min(a[0].stop, b[0].stop))
+    cols = slice(max(a[1].start, b[1].start), min(a[1].stop, b[1].stop))
+    if is_empty((rows, cols)):
+        return EMPTY
+    return (rows, cols)
@@ -0,0 +1,109 @@
+"""
+Shadowcasting vectorized over all eight octants with NumPy.
+
+Instead of recursing, every octant keeps the set of still-lit slopes as a
+row of boolean bins. Each depth is processed in one step: a cell is seen if
+any lit bin touches its slope range, and seen walls clear the bins strictly
+inside the range they shadow. Work is done on a (2 * radius + 1) square
+window around the origin, so the cost depends on the radius only.
+
+That makes it no faster than the recursive reference, which only visits
+the cells it sees: every depth costs a dozen NumPy calls however little is
+still lit. It pays off only on mostly open maps at small to middling
+radii; on dungeon levels and cluttered maps the reference is quicker.
+Run benchmarks/fov.py to compare the two.
+"""
+
+import functools
+
+import numpy as np
+
+from .recursive import OCTANTS
+from .region import window
+
+# Number of slope bins per unit of radius squared.
+BINS_PER_CELL = 2
+
+# Tolerance when placing slopes that fall exactly on a bin edge.
+EPSILON = 1e-9
+
+
+class _Depth:
+    """Window indices and slope bins of one depth across all octants."""
+
+    def __init__(self, depth, radius, bins):
+        cols = np.arange(depth + 1)
+        xx, xy, yx, yy = np.array(OCTANTS).T[:, :, None]
+
+        # Octant coordinates as used by the reference: dx <= 0, dy = -depth.
+        dx = -cols
+        dy = -depth
+        size = 2 * radius + 1
+        window_rows = radius + dx * yx + dy * yy
+        window_cols = radius + dx * xx + dy * xy
+        self.cells = (window_rows * size + window_cols).ravel()
+        in_radius = cols * cols + depth * depth < radius * radius
+        self.in_radius = np.broadcast_to(in_radius, window_rows.shape).ravel()
+
+        low = (cols - 0.5) / (depth + 0.5)
+        high = (cols + 0.5) / (depth - 0.5)
+        seen_lo = np.ceil(low * bins - EPSILON) - 1
+        seen_hi = np.floor(high * bins + EPSILON) + 1
+        shadow_lo = np.floor(low * bins + EPSILON) + 1
+        shadow_hi = np.ceil(high * bins - EPSILON) - 1
+        seen_lo = np.clip(seen_lo, 0, bins - 1)
+        seen_hi = np.clip(seen_hi, seen_lo + 1, bins)
+        shadow_lo = np.clip(shadow_lo, 0, bins)
+        shadow_hi = np.clip(shadow_hi, shadow_lo, bins)
+
+        # Offsets into the flattened (8, bins + 1) prefix and shadow arrays.
+        base = np.arange(8)[:, None] * (bins + 1)
+        self.seen_lo = (base + seen_lo).astype(np.intp).ravel()
+        self.seen_hi = (base + seen_hi).astype(np.intp).ravel()
+        self.shadow_lo = (base + shadow_lo).astype(np.intp).ravel()
+        self.shadow_hi = (base + shadow_hi).astype(np.intp).ravel()
+
+
+@functools.lru_cache(maxsize=16)
+def _depths(radius):
+    bins = BINS_PER_CELL * radius * (radius + 1)
+    depths = [_Depth(depth, radius, bins) for depth in range(1, radius + 1)]
+    return bins, depths
+
+
+def compute_fov(transparent, row, col, radius, fov=None):
+    """Return a boolean mask of the cells of transparent seen from row, col."""
+    if fov is None:
+        fov = np.zeros(transparent.shape, dtype=np.bool_)
+
+    # Cells outside the map stay opaque in the window.
+    size = 2 * radius + 1
+    region, local = window(transparent.shape, row, col, radius)
+    clear = np.zeros((size, size), dtype=np.bool_)
+    clear[local] = transparent[region]
+    clear = clear.ravel()
+    seen_cells = np.zeros(size * size, dtype=np.bool_)
+    seen_cells[radius * size + radius] = True
+
+    bins, depths = _depths(radius)
+    lit = np.ones((8, bins), dtype=np.bool_)
+    prefix = np.zeros((8, bins + 1), dtype=np.int32)
+    flat_prefix = prefix.ravel()
+    np.cumsum(lit, axis=1, out=prefix[:, 1:])
+    for depth in depths:
+        seen = flat_prefix[depth.seen_hi] > flat_prefix[depth.seen_lo]
+        seen_cells[depth.cells[seen & depth.in_radius]] = True
+
+        walls = seen & ~clear[depth.cells]
+        if depth is depths[-1] or not walls.any():
+            continue
+        shadow = np.bincount(depth.shadow_lo[walls], minlength=prefix.size)
+        shadow -= np.bincount(depth.shadow_hi[walls], minlength=prefix.size)
+        shadow = shadow.reshape(8, bins + 1)[:, :bins]
+        lit &= np.cumsum(shadow, axis=1) == 0
+        np.cumsum(lit, axis=1, out=prefix[:, 1:])
+        if not prefix[:, -1].any():
+            break
+
+    fov[region] |= seen_cells.reshape(size, size)[local]
+    return fov
@@ -0,0 +1,37 @@
+"""
+Input sources for running the game loop without a window.
+
+Each source is an iterator of Key objects that handle_keys() accepts in
+place of the key presses the main loop reads from the window.
+"""
+
+import random
+
+import tcod as libtcod
+
+# Keys a player can press during a turn: eight directions and wait.
+TURN_KEYS = (libtcod.KEY_KP1, libtcod.KEY_KP2, libtcod.KEY_KP3,
+             libtcod.KEY_KP4, libtcod.KEY_KP5, libtcod.KEY_KP6,
+             libtcod.KEY_KP7, libtcod.KEY_KP8, libtcod.KEY_KP9)
+
+
+class Key:
+    """The parts of a libtcod key event that the game looks at."""
+
+    def __init__(self, vk, lalt=False, ralt=False):
+        self.vk = vk
+        self.lalt = lalt
+        self.ralt = ralt
+
+
+def random_keys(seed=None):
+    """Yield an endless stream of random movement and wait keys."""
+    rng = random.Random(seed)
+    while True:
+        yield Key(rng.choice(TURN_KEYS))
+
+
+def scripted_keys(names):
+    """Yield the keys named in names, e.g. ['KP6', 'UP'], then stop."""
+    for name in names:
+        yield Key(getattr(libtcod, 'KEY_' + name.upper()))
@@ -0,0 +1,140 @@
+"""
+Levels generated from a seed, and a cache of them.
+
+A level is everything generation decides: the tile planes, the rooms and
+where the player and monsters start. It depends on nothing but its seed
+and generator parameters, so it can be kept and handed to any number of
+worlds instead of being generated again.
+"""
+
+import collections
+import os
+import random
+import tempfile
+
+import numpy as np
+
+from .dungeon import carve_h_tunnel, carve_rooms, carve_v_tunnel
+from .tilemap import TileMap
+
+# rooms holds x1, y1, x2, y2 per room, start the player's x, y and monsters
+# the x, y of each monster, in the order they were placed.
+Level = collections.namedtuple(
+    'Level', ['blocked', 'blocked_sight', 'rooms', 'start', 'monsters'])
+
+
+def generate(seed, width, height, max_rooms, room_min_size, room_max_size,
+             max_room_monsters, exits=()):
+    """
+    Generate the level for seed with the given parameters.
+
+    The player starts in the centre of the first room; every other room
+    gets up to max_room_monsters monsters, skipping any that land on a wall
+    or on another monster. A tunnel leads from the first room to each of
+    the (x, y) cells in exits, e.g. to meet those of a neighbouring level.
+    """
+    rng = random.Random(seed)
+    tiles = TileMap(width, height)
+    rooms = []
+    start = None
+    monsters = []
+    taken = set()
+    for number, room in enumerate(carve_rooms(
+            tiles, max_rooms, room_min_size, room_max_size, rng)):
+        rooms.append((room.x1, room.y1, room.x2, room.y2))
+        if number == 0:
+            start = room.centre()
+            taken.add(start)
+            continue
+
+        for i in range(rng.randint(0, max_room_monsters)):
+            x = rng.randint(room.x1, room.x2)
+            y = rng.randint(room.y1, room.y2)
+            if not tiles.blocked[y, x] and (x, y) not in taken:
+                taken.add((x, y))
+                monsters.append((x, y))
+
+    for x, y in exits:
+        carve_h_tunnel(tiles, start[0], x, start[1])
+        carve_v_tunnel(tiles, start[1], y, x)
+
+    return Level(tiles.blocked, tiles.blocked_sight,
+                 np.array(rooms, dtype=np.int32).reshape(-1, 4), start,
+                 np.array(monsters, dtype=np.int32).reshape(-1, 2))
+
+
+def save(level, path):
+    """Write level to path as an .npz file with bit-packed planes."""
+    # Written to a temporary file and renamed, so processes sharing a
+    # directory never see half a level.
+    directory = os.path.dirname(path) or '.'
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.npz',
+                                     delete=False) as f:
+        np.savez(f, shape=level.blocked.shape,
+                 blocked=np.packbits(level.blocked),
+                 blocked_sight=np.packbits(level.blocked_sight),
+                 rooms=level.rooms, start=level.start,
+                 monsters=level.monsters)
+    os.replace(f.name, path)
+
+
+def load(path):
+    with np.load(path) as data:
+        height, width = data['shape']
+        size = height * width
+
+        def plane(name):
+            bits = np.unpackbits(data[name], count=size)
+            return bits.view(np.bool_).reshape(height, width)
+
+        return Level(plane('blocked'), plane('blocked_sight'), data['rooms'],
+                     tuple(data['start'].tolist()), data['monsters'])
+
+
+class LevelCache:
+    """
+    Generated levels by seed and parameters, least recently used dropped.
+
+    With directory set, levels are also kept there, one file each, and read
+    back rather than generated when they drop out of memory or the cache is
+    created anew, e.g. in another process. The directory is created if
+    need be.
+    """
+
+    def __init__(self, capacity=32, directory=None):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        self.directory = directory
+        self.levels = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.levels)
+
+    def path(self, key):
+        name = 'level_' + '_'.join(str(value) for value in key) + '.npz'
+        return os.path.join(self.directory, name)
+
+    def get(self, seed, *params):
+        """Return the level generate(seed, *params) would."""
+        key = (seed,) + params
+        level = self.levels.get(key)
+        if level is not None:
+            self.hits += 1
+            self.levels.move_to_end(key)
+            return level
+
+        self.misses += 1
+        if self.directory and os.path.exists(self.path(key)):
+            level = load(self.path(key))
+        else:
+            level = generate(seed, *params)
+            if self.directory:
+                save(level, self.path(key))
+
+        self.levels[key] = level
+        if len(self.levels) > self.capacity:
+            self.levels.popitem(last=False)
+        return level
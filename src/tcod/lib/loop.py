@@ -0,0 +1,76 @@
+"""
+A main loop that runs at a steady rate rather than waiting for each key.
+
+Every tick drains the key presses that are pending, hands them to the
+game, steps the simulation, draws and flushes, then sleeps until the next
+one. The screen keeps updating between turns, and threads working in the
+background get the time the main thread spends asleep rather than waiting
+for a key.
+"""
+
+import time
+
+import tcod as libtcod
+
+from .profiler import Profiler
+
+LIMIT_FPS = 30
+
+
+def pending_keys():
+    """Return the key presses waiting to be handled, without blocking."""
+    keys = []
+    mouse = libtcod.Mouse()
+    while True:
+        key = libtcod.Key()
+        if not libtcod.sys_check_for_event(libtcod.EVENT_KEY_PRESS, key,
+                                           mouse):
+            return keys
+        keys.append(key)
+
+
+class Loop:
+    """
+    Input, simulation and drawing as stages run once per tick.
+
+    handle_key(key) is called for each key pressed since the last tick and
+    stops the loop by returning 'exit'. update(seconds), if given, is then
+    called with the time since the last tick, and render() before the
+    flush.
+    """
+
+    def __init__(self, handle_key, render, update=None, fps=LIMIT_FPS,
+                 profiler=None):
+        self.handle_key = handle_key
+        self.render = render
+        self.update = update
+        self.tick = 1.0 / fps
+        self.profiler = profiler if profiler is not None else Profiler()
+
+    def run(self):
+        """Run ticks until the window is closed or a key handler exits."""
+        profiler = self.profiler
+        last = deadline = time.perf_counter()
+        while not libtcod.console_is_window_closed():
+            deadline += self.tick
+            # The frame time covers the stages, not the sleep after.
+            with profiler.frame():
+                with profiler.phase('events'):
+                    keys = pending_keys()
+                for key in keys:
+                    if self.handle_key(key) == 'exit':
+                        return
+                now = time.perf_counter()
+                if self.update is not None:
+                    self.update(now - last)
+                last = now
+                self.render()
+                with profiler.phase('flush'):
+                    libtcod.console_flush()
+
+            spare = deadline - time.perf_counter()
+            if spare > 0:
+                time.sleep(spare)
+            else:
+                # Behind: start afresh rather than rush to catch up.
+                deadline = time.perf_counter()
@@ -0,0 +1,243 @@
+"""
+Paths over the blocked plane of a tile map.
+
+Cells are addressed (row, col). A step goes to any of the eight neighbours
+and costs one, as monsters move diagonally as freely as straight, so the
+distance between two cells in the open is their Chebyshev distance.
+"""
+
+import heapq
+
+import numpy as np
+
+from .fov import region
+
+# Offsets (drow, dcol) of the eight neighbours of a cell.
+NEIGHBOURS = ((-1, 0), (0, -1), (0, 1), (1, 0),
+              (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# Distance of cells that cannot reach the goal.
+UNREACHABLE = np.iinfo(np.int32).max
+
+
+def astar(blocked, start, goal, limit=None):
+    """
+    Return the cells of a shortest path from start to goal, or None.
+
+    The path excludes start and ends with goal. With limit set, paths
+    longer than limit steps are not searched for.
+    """
+    height, width = blocked.shape
+    goal_row, goal_col = goal
+
+    def estimate(cell):
+        return max(abs(cell[0] - goal_row), abs(cell[1] - goal_col))
+
+    # Entries are (estimated length, steps so far, tie breaker, cell); the
+    # tie breaker keeps the order deterministic without comparing cells.
+    queue = [(estimate(start), 0, 0, start)]
+    came_from = {start: None}
+    steps = {start: 0}
+    pushed = 1
+    while queue:
+        _, cost, _, cell = heapq.heappop(queue)
+        if cell == goal:
+            path = []
+            while cell != start:
+                path.append(cell)
+                cell = came_from[cell]
+            path.reverse()
+            return path
+        if cost > steps[cell] or (limit is not None and cost >= limit):
+            continue
+
+        row, col = cell
+        for drow, dcol in NEIGHBOURS:
+            next_row, next_col = row + drow, col + dcol
+            if not (0 <= next_row < height and 0 <= next_col < width):
+                continue
+            if blocked[next_row, next_col]:
+                continue
+            neighbour = (next_row, next_col)
+            if cost + 1 < steps.get(neighbour, UNREACHABLE):
+                steps[neighbour] = cost + 1
+                came_from[neighbour] = cell
+                heapq.heappush(queue, (cost + 1 + estimate(neighbour),
+                                       cost + 1, pushed, neighbour))
+                pushed += 1
+    return None
+
+
+def _grow(mask):
+    """Return mask with every cell next to a set cell set as well."""
+    rows = mask.copy()
+    rows[1:] |= mask[:-1]
+    rows[:-1] |= mask[1:]
+    grown = rows.copy()
+    grown[:, 1:] |= rows[:, :-1]
+    grown[:, :-1] |= rows[:, 1:]
+    return grown
+
+
+class DistanceMap:
+    """
+    Steps from every cell around a goal to reach it.
+
+    The map is built breadth first over a window of the given radius around
+    the goal, one whole ring of cells per NumPy step, and is only rebuilt
+    when the goal moves. Any number of walkers can then look up their next
+    step in constant time.
+    """
+
+    def __init__(self, blocked, radius=None):
+        self.blocked = blocked
+        self.radius = radius or max(blocked.shape)
+        self.goal = None
+        self.region = region.EMPTY
+        self.distances = np.empty((0, 0), dtype=np.int32)
+
+    def update(self, row, col):
+        """Rebuild the map for a goal at row, col; False if unchanged."""
+        if self.goal == (row, col):
+            return False
+
+        self.goal = (row, col)
+        self.region, _ = region.window(self.blocked.shape, row, col,
+                                       self.radius)
+        passable = ~self.blocked[self.region]
+        distances = np.full(passable.shape, UNREACHABLE, dtype=np.int32)
+
+        rows, cols = self.region
+        reached = np.zeros(passable.shape, dtype=np.bool_)
+        reached[row - rows.start, col - cols.start] = True
+        frontier = reached
+        distance = 0
+        while frontier.any():
+            distances[frontier] = distance
+            frontier = _grow(frontier) & passable & ~reached
+            reached |= frontier
+            distance += 1
+        self.distances = distances
+        return True
+
+    def covers(self, rows, cols):
+        """Whether the map reaches row, col; works on arrays as well."""
+        rows_region, cols_region = self.region
+        return ((rows >= rows_region.start) & (rows < rows_region.stop) &
+                (cols >= cols_region.start) & (cols < cols_region.stop))
+
+    def distances_at(self, rows, cols):
+        """Vectorized distance() for arrays of rows and cols."""
+        inside = self.covers(rows, cols)
+        distances = np.full(rows.shape, UNREACHABLE, dtype=np.int32)
+        distances[inside] = self.distances[
+            rows[inside] - self.region[0].start,
+            cols[inside] - self.region[1].start]
+        return distances
+
+    def distance(self, row, col):
+        if self.covers(row, col):
+            rows, cols = self.region
+            return int(self.distances[row - rows.start, col - cols.start])
+        return UNREACHABLE
+
+    def step(self, row, col, is_blocked=None):
+        """
+        Return the neighbour of row, col that is closest to the goal.
+
+        Only neighbours closer than row, col itself are considered, and
+        those for which is_blocked(row, col) is true are skipped. Returns
+        None if there is no such neighbour.
+        """
+        best = None
+        best_distance = self.distance(row, col)
+        for drow, dcol in NEIGHBOURS:
+            next_row, next_col = row + drow, col + dcol
+            distance = self.distance(next_row, next_col)
+            if distance >= best_distance:
+                continue
+            if is_blocked is not None and is_blocked(next_row, next_col):
+                continue
+            best = (next_row, next_col)
+            best_distance = distance
+        return best
+
+    def steps(self, rows, cols, blocked, origin=(0, 0)):
+        """
+        Vectorized step() for walkers at rows, cols.
+
+        Cells set in the blocked plane are skipped; blocked covers the map
+        from the (row, col) origin on, and must cover every neighbour of
+        the walkers. Returns the rows and cols of the chosen neighbours and
+        a mask of the walkers that have one; ties go to the same neighbour
+        as in step().
+        """
+        offsets = np.array(NEIGHBOURS)
+        next_rows = rows[:, None] + offsets[:, 0]
+        next_cols = cols[:, None] + offsets[:, 1]
+        distances = self.distances_at(next_rows, next_cols)
+
+        # Cells without a distance are never chosen, so only cells with one
+        # need to be looked up in blocked, and those are all on the map.
+        known = distances < UNREACHABLE
+        known[known] = blocked[next_rows[known] - origin[0],
+                               next_cols[known] - origin[1]]
+        distances[known] = UNREACHABLE
+
+        best = distances.argmin(axis=1)
+        walkers = np.arange(len(rows))
+        found = distances[walkers, best] < self.distances_at(rows, cols)
+        return next_rows[walkers, best], next_cols[walkers, best], found
+
+
+def step_all(distance_map, rows, cols, occupied, area=None):
+    """
+    Move every walker at rows, cols one step towards the goal together.
+
+    Walkers may not enter cells set in occupied, which is updated as they
+    move. occupied covers area, a (rows, cols) region of the map holding
+    the walkers and their neighbours, or the whole map if area is None, so
+    the work depends on where the walkers are rather than on the size of
+    the map. A cell wanted by several walkers goes to the one that comes
+    first in rows, cols; the others then choose again, as do walkers next
+    to a cell that has just been left. Returns the new rows and cols.
+    """
+    origin = (0, 0) if area is None else (area[0].start, area[1].start)
+    # Worked on in the coordinates of occupied from here on.
+    rows = rows - origin[0]
+    cols = cols - origin[1]
+    moved = np.zeros(len(rows), dtype=np.bool_)
+    waiting = np.arange(len(rows))
+    while waiting.size:
+        next_rows, next_cols, found = distance_map.steps(
+            rows[waiting] + origin[0], cols[waiting] + origin[1], occupied,
+            origin)
+        if not found.any():
+            break
+        next_rows -= origin[0]
+        next_cols -= origin[1]
+
+        # np.unique() returns the first index of every cell, and waiting is
+        # in walker order, so the earliest walker wins each cell.
+        candidates = np.flatnonzero(found)
+        cells = (next_rows[candidates] * occupied.shape[1] +
+                 next_cols[candidates])
+        _, first = np.unique(cells, return_index=True)
+        winners = candidates[first]
+        movers = waiting[winners]
+
+        left = np.zeros(occupied.shape, dtype=np.bool_)
+        left[rows[movers], cols[movers]] = True
+        occupied[left] = False
+        rows[movers] = next_rows[winners]
+        cols[movers] = next_cols[winners]
+        occupied[rows[movers], cols[movers]] = True
+        moved[movers] = True
+
+        # A walker without a step can only get one when a cell next to it
+        # is left, so only those and the walkers that lost a cell go on.
+        again = _grow(left)[rows, cols] & ~moved
+        found[winners] = False
+        again[waiting[found]] = True
+        waiting = np.flatnonzero(again)
+    return rows + origin[0], cols + origin[1]
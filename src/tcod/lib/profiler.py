@@ -0,0 +1,90 @@
+"""
+Timing and counting for the main loop.
+
+A Profiler times named phases and whole frames and counts events. A phase
+costs two perf_counter() calls and a count one Counter increment, so it is
+cheap enough to leave on.
+"""
+
+import collections
+import contextlib
+import json
+import time
+
+import numpy as np
+
+
+class Profiler:
+    """
+    Seconds spent per phase, event counts and the times of recent frames.
+
+    The last window frame times are kept for percentiles.
+    """
+
+    def __init__(self, window=256):
+        self.totals = collections.Counter()
+        self.calls = collections.Counter()
+        self.counts = collections.Counter()
+        self.frame_times = np.zeros(window)
+        self.frames = 0
+        # Seconds per phase during the frame in progress and the last one.
+        self.current = collections.Counter()
+        self.last = collections.Counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[name] += elapsed
+            self.calls[name] += 1
+            self.current[name] += elapsed
+
+    @contextlib.contextmanager
+    def frame(self):
+        self.current = collections.Counter()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.frame_times[self.frames % len(self.frame_times)] = elapsed
+            self.frames += 1
+            self.last = self.current
+
+    def percentiles(self, *percents):
+        """Return the given percentiles of the recent frame times."""
+        recent = self.frame_times[:self.frames]
+        if not recent.size:
+            return [0.0] * len(percents)
+        return np.percentile(recent, percents).tolist()
+
+    def summary(self):
+        p50, p99 = self.percentiles(50, 99)
+        return {
+            'frames': self.frames,
+            'frame_p50': p50,
+            'frame_p99': p99,
+            'phases': {name: {'seconds': total, 'calls': self.calls[name],
+                              'mean': total / self.calls[name]}
+                       for name, total in self.totals.items()},
+            'counts': dict(self.counts),
+        }
+
+    def export(self, path):
+        """Write summary() to path as JSON."""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
+
+    def lines(self):
+        """Short lines on recent frames and the counts, for an overlay."""
+        p50, p99 = self.percentiles(50, 99)
+        lines = ['frame p50 %.1fms p99 %.1fms' % (p50 * 1000, p99 * 1000),
+                 'ms ' + ' '.join('%s %.1f' % (name, seconds * 1000)
+                                  for name, seconds in self.last.items())]
+        counts = ['%s %d' % item for item in sorted(self.counts.items())]
+        for i in range(0, len(counts), 2):
+            lines.append('  '.join(counts[i:i + 2]))
+        return lines
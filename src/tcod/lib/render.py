@@ -0,0 +1,128 @@
+import numpy as np
+
+from lib.fov import region
+
+
+class DirtyCells:
+    """
+    Cells of a console that changed since it was last pushed to the screen.
+
+    Cells are marked by (x, y), by arrays of rows and cols or by a
+    (rows, cols) region and mask, and read back in row-major order together
+    with the bounding region that has to be blitted.
+    """
+
+    def __init__(self, width, height):
+        self.cells = np.zeros((height, width), dtype=np.bool_)
+        self.bounds = region.EMPTY
+
+    def mark(self, x, y):
+        self.cells[y, x] = True
+        self.bounds = region.union(self.bounds,
+                                   (slice(y, y + 1), slice(x, x + 1)))
+
+    def mark_cells(self, rows, cols):
+        """Mark the cells at arrays of rows and cols."""
+        if not len(rows):
+            return
+        self.cells[rows, cols] = True
+        self.bounds = region.union(self.bounds, (
+            slice(int(rows.min()), int(rows.max()) + 1),
+            slice(int(cols.min()), int(cols.max()) + 1)))
+
+    def mark_mask(self, area, mask):
+        """Mark the cells of area where mask is set."""
+        if not mask.any():
+            return
+        self.cells[area] |= mask
+        rows, cols = np.nonzero(mask)
+        top = area[0].start + int(rows.min())
+        left = area[1].start + int(cols.min())
+        bottom = area[0].start + int(rows.max()) + 1
+        right = area[1].start + int(cols.max()) + 1
+        self.bounds = region.union(self.bounds,
+                                   (slice(top, bottom), slice(left, right)))
+
+    def mark_area(self, area):
+        """Mark every cell of area."""
+        if region.is_empty(area):
+            return
+        self.cells[area] = True
+        self.bounds = region.union(self.bounds, area)
+
+    def clear(self):
+        self.cells[self.bounds] = False
+        self.bounds = region.EMPTY
+
+    def __bool__(self):
+        return not region.is_empty(self.bounds)
+
+    def __iter__(self):
+        return self.where(None)
+
+    def where(self, plane):
+        """Yield the (row, col) of every dirty cell that is set in plane."""
+        rows, cols = self.bounds
+        cells = self.cells[self.bounds]
+        if plane is not None:
+            cells = cells & plane[self.bounds]
+        for row, col in np.argwhere(cells):
+            yield rows.start + int(row), cols.start + int(col)
+
+
+class Camera:
+    """
+    The part of a map shown on screen: width x height cells from x, y.
+
+    follow() keeps a target in the middle of the view without showing
+    anything past the edges of the map.
+    """
+
+    def __init__(self, width, height, map_width, map_height):
+        self.width = width
+        self.height = height
+        self.map_width = map_width
+        self.map_height = map_height
+        self.x = 0
+        self.y = 0
+
+    @property
+    def area(self):
+        """The (rows, cols) region of the map in view."""
+        return (slice(self.y, self.y + self.height),
+                slice(self.x, self.x + self.width))
+
+    def follow(self, x, y):
+        """Centre the view on x, y as far as the map allows; True if moved."""
+        new_x = max(min(x - self.width // 2, self.map_width - self.width), 0)
+        new_y = max(min(y - self.height // 2, self.map_height - self.height),
+                    0)
+        if (new_x, new_y) == (self.x, self.y):
+            return False
+        self.x = new_x
+        self.y = new_y
+        return True
+
+
+def draw_tiles(console, tiles, area, visible_colour, explored_colour=None,
+               mask=None, wall='#', floor='.'):
+    """
+    Write the tiles of area to the console buffers in one step.
+
+    Visible tiles are drawn in visible_colour and, if explored_colour is
+    given, explored tiles that are out of view in explored_colour. Other
+    cells, and cells not set in mask, are left untouched.
+    """
+    visible = tiles.visible[area]
+    draw = visible
+    if explored_colour is not None:
+        draw = visible | tiles.explored[area]
+    if mask is not None:
+        draw = draw & mask
+
+    glyphs = np.where(tiles.blocked_sight[area], ord(wall), ord(floor))
+    console.ch[area][draw] = glyphs[draw]
+    fg = console.fg[area]
+    fg[draw & visible] = tuple(visible_colour)
+    if explored_colour is not None:
+        fg[draw & ~visible] = tuple(explored_colour)
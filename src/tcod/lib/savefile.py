@@ -0,0 +1,120 @@
+"""
+Binary snapshots of a tile map, a state record and entity records.
+
+A file holds a header, the four planes of the TileMap bit-packed and
+padded to 8 bytes each, one state record and then a fixed-width record
+per entity. The layout of the records is given by the caller as NumPy
+structured dtypes, little-endian like the header. Every part is at an
+offset known from the header, so load() maps the file and views the
+records in place through np.frombuffer() rather than parsing anything.
+pack() and unpack() do the same with bytes in memory.
+"""
+
+import mmap
+import os
+
+import numpy as np
+
+from .tilemap import TileMap
+
+MAGIC = b'TCODSAVE'
+VERSION = 1
+PLANES = ('blocked', 'blocked_sight', 'explored', 'visible')
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('width', '<u4'),
+                   ('height', '<u4'), ('count', '<u4'),
+                   ('state_size', '<u4'), ('record_size', '<u4')])
+
+
+def _plane_size(width, height):
+    return (width * height + 63) // 64 * 8
+
+
+def pack(tiles, state, records):
+    """Return tiles, a state record and an array of records as bytes."""
+    header = np.zeros((), dtype=HEADER)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['width'] = tiles.width
+    header['height'] = tiles.height
+    header['count'] = len(records)
+    header['state_size'] = state.dtype.itemsize
+    header['record_size'] = records.dtype.itemsize
+
+    plane_size = _plane_size(tiles.width, tiles.height)
+    parts = [header.tobytes()]
+    for name in PLANES:
+        bits = np.packbits(getattr(tiles, name))
+        parts.append(bits.tobytes())
+        parts.append(bytes(plane_size - bits.size))
+    parts.append(state.tobytes())
+    parts.append(records.tobytes())
+    return b''.join(parts)
+
+
+def unpack(data, state_dtype, record_dtype):
+    """
+    Read tiles, state and records from a buffer written by pack().
+
+    The records are a view of data. Raises ValueError if data is not a
+    snapshot or its records are not of the given dtypes.
+    """
+    if len(data) < HEADER.itemsize:
+        raise ValueError("not a snapshot")
+    header = np.frombuffer(data, dtype=HEADER, count=1)[0]
+    if header['magic'] != MAGIC or header['version'] != VERSION:
+        raise ValueError("not a snapshot")
+    if (header['state_size'] != state_dtype.itemsize or
+            header['record_size'] != record_dtype.itemsize):
+        raise ValueError("snapshot records do not match")
+
+    width = int(header['width'])
+    height = int(header['height'])
+    count = int(header['count'])
+    plane_size = _plane_size(width, height)
+    offset = HEADER.itemsize
+    if len(data) != (offset + len(PLANES) * plane_size +
+                     state_dtype.itemsize + count * record_dtype.itemsize):
+        raise ValueError("truncated snapshot")
+
+    tiles = TileMap(width, height)
+    for name in PLANES:
+        bits = np.frombuffer(data, dtype=np.uint8, count=plane_size,
+                             offset=offset)
+        plane = np.unpackbits(bits, count=width * height)
+        getattr(tiles, name)[:] = plane.reshape(height, width)
+        offset += plane_size
+
+    state = np.frombuffer(data, dtype=state_dtype, count=1, offset=offset)[0]
+    offset += state_dtype.itemsize
+    records = np.frombuffer(data, dtype=record_dtype, count=count,
+                            offset=offset)
+    return tiles, state, records
+
+
+def save(path, tiles, state, records):
+    """
+    Write tiles, a state record and an array of entity records to path.
+
+    The file is written under a temporary name and renamed into place, so
+    an existing snapshot is never left half overwritten.
+    """
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(pack(tiles, state, records))
+    os.replace(temporary, path)
+
+
+def load(path, state_dtype, record_dtype):
+    """
+    Read a file written by save(); return its tiles, state and records.
+
+    The records are a read-only view of the mapped file. Raises ValueError
+    if the file is not a snapshot or its records are not of the given
+    dtypes.
+    """
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return unpack(data, state_dtype, record_dtype)
+    except ValueError as error:
+        raise ValueError("%s: %s" % (error, path)) from None
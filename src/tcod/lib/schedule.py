@@ -0,0 +1,59 @@
+import heapq
+
+
+class Scheduler:
+    """
+    Actors ordered by the time of their next action.
+
+    Actors are kept in a heap of (time, order, actor) entries and are in it
+    at most once. An actor that is popped and not scheduled again simply
+    drops out, so nothing has to be removed from the middle of the heap.
+    """
+
+    def __init__(self):
+        self.time = 0
+        self.queue = []
+        self.scheduled = set()
+        self.order = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __contains__(self, actor):
+        return id(actor) in self.scheduled
+
+    def schedule(self, actor, delay):
+        """Queue actor delay time units from now, unless already queued."""
+        if id(actor) in self.scheduled:
+            return False
+        self.scheduled.add(id(actor))
+        heapq.heappush(self.queue, (self.time + delay, self.order, actor))
+        self.order += 1
+        return True
+
+    def restore(self, time, order, entries):
+        """Reset the clock and queue to (time, order, actor) entries."""
+        self.time = time
+        self.order = order
+        self.queue = list(entries)
+        heapq.heapify(self.queue)
+        self.scheduled = {id(actor) for _, _, actor in self.queue}
+
+    def pop_due(self, until):
+        """
+        Pop every actor due at the earliest time up to until.
+
+        The clock moves on to that time. Returns the actors in the order
+        they were scheduled, or an empty list if none is due by until.
+        """
+        queue = self.queue
+        if not queue or queue[0][0] > until:
+            return []
+
+        self.time = queue[0][0]
+        actors = []
+        while queue and queue[0][0] == self.time:
+            _, _, actor = heapq.heappop(queue)
+            self.scheduled.discard(id(actor))
+            actors.append(actor)
+        return actors
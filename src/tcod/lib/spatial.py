@@ -0,0 +1,56 @@
+class SpatialIndex:
+    """
+    Objects bucketed by the (x, y) cell they occupy.
+
+    Anything with x and y attributes can be indexed. Positions must only be
+    changed through move() so the buckets stay in sync.
+    """
+
+    def __init__(self):
+        self.cells = {}
+
+    def add(self, obj):
+        self.cells.setdefault((obj.x, obj.y), []).append(obj)
+
+    def remove(self, obj):
+        key = (obj.x, obj.y)
+        bucket = self.cells[key]
+        bucket.remove(obj)
+        if not bucket:
+            del self.cells[key]
+
+    def move(self, obj, x, y):
+        self.remove(obj)
+        obj.x = x
+        obj.y = y
+        self.add(obj)
+
+    def at(self, x, y):
+        return self.cells.get((x, y), ())
+
+    def within(self, area):
+        """Yield the objects in a (rows, cols) region of the map."""
+        rows, cols = area
+        size = (rows.stop - rows.start) * (cols.stop - cols.start)
+        if size <= len(self.cells):
+            for y in range(rows.start, rows.stop):
+                for x in range(cols.start, cols.stop):
+                    yield from self.cells.get((x, y), ())
+            return
+
+        # Fewer occupied cells than cells in the region: scan those instead.
+        for (x, y), bucket in self.cells.items():
+            if rows.start <= y < rows.stop and cols.start <= x < cols.stop:
+                yield from bucket
+
+    def blocker_at(self, x, y):
+        for obj in self.at(x, y):
+            if obj.blocks:
+                return obj
+        return None
+
+    def fighter_at(self, x, y):
+        for obj in self.at(x, y):
+            if obj.fighter:
+                return obj
+        return None
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class TileMap:
+    """
+    Represents the map as packed NumPy planes, one per tile property.
+
+    Planes are indexed [row, col] and can be consumed whole by the renderer,
+    collision checks and FOV setup. map[row][col].blocked style access is
+    kept for code that works on a single tile.
+    """
+
+    def __init__(self, width, height, blocked=True, blocked_sight=None):
+        self.width = width
+        self.height = height
+
+        if blocked_sight is None:
+            blocked_sight = blocked
+        self.blocked = np.full((height, width), blocked, dtype=np.bool_)
+        self.blocked_sight = np.full((height, width), blocked_sight,
+                                     dtype=np.bool_)
+        self.explored = np.zeros((height, width), dtype=np.bool_)
+        self.visible = np.zeros((height, width), dtype=np.bool_)
+
+    @property
+    def shape(self):
+        return (self.height, self.width)
+
+    @property
+    def transparent(self):
+        return ~self.blocked_sight
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.height:
+            raise IndexError(row)
+        return TileRow(self, row)
+
+    def __iter__(self):
+        for row in range(self.height):
+            yield TileRow(self, row)
+
+
+class TileRow:
+    """A single row of a TileMap. Indexing it yields a TileView."""
+
+    __slots__ = ('tiles', 'row')
+
+    def __init__(self, tiles, row):
+        self.tiles = tiles
+        self.row = row
+
+    def __len__(self):
+        return self.tiles.width
+
+    def __getitem__(self, col):
+        if not 0 <= col < self.tiles.width:
+            raise IndexError(col)
+        return TileView(self.tiles, self.row, col)
+
+    def __iter__(self):
+        for col in range(self.tiles.width):
+            yield TileView(self.tiles, self.row, col)
+
+
+def _plane_property(name):
+    def fget(self):
+        return bool(getattr(self.tiles, name)[self.row, self.col])
+
+    def fset(self, value):
+        getattr(self.tiles, name)[self.row, self.col] = value
+
+    return property(fget, fset)
+
+
+class TileView:
+    """A single tile of a TileMap, reading and writing through its planes."""
+
+    __slots__ = ('tiles', 'row', 'col')
+
+    def __init__(self, tiles, row, col):
+        self.tiles = tiles
+        self.row = row
+        self.col = col
+
+    blocked = _plane_property('blocked')
+    blocked_sight = _plane_property('blocked_sight')
+    explored = _plane_property('explored')
+    visible = _plane_property('visible')